@@ -0,0 +1,74 @@
+from nonebot import get_plugin_config
+from nonebot.plugin import PluginMetadata
+
+from .config import Config
+
+__plugin_meta__ = PluginMetadata(
+    name="classifier",
+    description="消息预分类：每条消息只提取一次纯文本并做一次关键词匹配，供各插件的规则复用",
+    usage="",
+    config=Config,
+)
+
+config = get_plugin_config(Config)
+
+import re
+from typing import Dict, FrozenSet, Iterable, Optional, Pattern
+
+from nonebot.adapters.onebot.v11 import MessageEvent
+from nonebot.message import event_preprocessor
+from nonebot.typing import T_State
+
+# 预分类结果在 state 中的键
+STATE_KEY = "_classification"
+
+
+class Classification:
+    """单条消息的预分类结果"""
+    __slots__ = ("text", "lowered", "categories")
+
+    def __init__(self, text: str, lowered: str, categories: FrozenSet[str]):
+        # 去除首尾空白的纯文本
+        self.text = text
+        # 小写形式
+        self.lowered = lowered
+        # 命中的关键词类别
+        self.categories = categories
+
+
+# 关键词（小写）-> 类别
+_keywords: Dict[str, str] = {}
+_pattern: Optional[Pattern] = None
+_EMPTY: FrozenSet[str] = frozenset()
+
+
+def register_keywords(category: str, keywords: Iterable[str]):
+    """注册关键词，消息（小写后）包含任意一个关键词即命中该类别"""
+    global _pattern
+    for keyword in keywords:
+        _keywords[keyword.lower()] = category
+    # 所有关键词合并为一个正则，长的优先，一次扫描完成匹配
+    _pattern = re.compile("|".join(map(re.escape, sorted(_keywords, key=len, reverse=True))))
+
+
+def _classify(event: MessageEvent) -> Classification:
+    text = event.get_plaintext().strip()
+    lowered = text.lower()
+    if _pattern is None or not lowered:
+        return Classification(text, lowered, _EMPTY)
+    hits = _pattern.findall(lowered)
+    categories = frozenset(_keywords[hit] for hit in hits) if hits else _EMPTY
+    return Classification(text, lowered, categories)
+
+
+def classify(event: MessageEvent, state: T_State) -> Classification:
+    """获取消息的预分类结果，state 中没有时现场计算"""
+    result = state.get(STATE_KEY)
+    if result is None:
+        result = state[STATE_KEY] = _classify(event)
+    return result
+
+
+@event_preprocessor
+async def _preclassify(event: MessageEvent, state: T_State):
+    state[STATE_KEY] = _classify(event)
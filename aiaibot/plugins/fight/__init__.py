@@ -1,17 +1,39 @@
-from nonebot import get_plugin_config
+from nonebot import get_plugin_config, require
 from nonebot.plugin import PluginMetadata
-from nonebot import on_message, get_bot, logger
+from nonebot import on_message, logger
 from nonebot.adapters.onebot.v11 import (
+    Bot,
     GroupMessageEvent,
     Message,
     MessageSegment
 )
 from nonebot.rule import Rule, to_me
+from nonebot.typing import T_State
 from nonebot.matcher import Matcher
 from nonebot.exception import ActionFailed
-import asyncio
-import re
-from typing import Dict, Optional
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+# 超时统一交给共享的定时任务调度器，不再为每个超时单独创建 sleep 任务
+require("nonebot_plugin_apscheduler")
+from nonebot_plugin_apscheduler import scheduler
+from apscheduler.jobstores.base import JobLookupError
+
+# 群成员身份缓存，决斗结果判定时不再每次请求 get_group_member_info
+group_member = require("group_member")
+# 决斗状态存放在共享状态存储中，多个 worker 之间也能看到
+state_store = require("state_store")
+# 消息与禁言经出站队列发送，决斗结果优先
+outbound = require("outbound")
+# 消息预分类，规则中不再各自提取纯文本和扫描关键词
+classifier = require("classifier")
+classifier.register_keywords("shoot", ["开枪", "开抢", "bang", "shoot"])
+# 运行指标
+metrics = require("metrics")
+
+# 确认决斗的回复
+CONFIRM_WORDS = {"接受", "确认", "y", "yes", "ok"}
 
 from .config import Config
 
@@ -25,295 +47,290 @@ __plugin_meta__ = PluginMetadata(
 config = get_plugin_config(Config)
 
 # 存储等待确认的决斗请求 {群号: 请求信息}
-pending_duels: Dict[int, dict] = {}
+pending_duels = state_store.get_store("fight_pending")
 # 存储进行中的决斗 {群号: 决斗信息}
-ongoing_duels: Dict[int, dict] = {}
-# 全局锁
-duel_lock = asyncio.Lock()
+ongoing_duels = state_store.get_store("fight_ongoing")
+# 状态的最长保留时间，进程意外退出后残留的决斗会自动失效
+PENDING_TTL = 30 + 10
+ONGOING_TTL = 5 + 30 + 10
+
+
+def schedule_after(seconds: int, duel_id: str, func, *args):
+    """在 seconds 秒后执行 func(*args)，每局决斗同一时间只有一个定时任务"""
+    scheduler.add_job(
+        func,
+        "date",
+        run_date=datetime.now(timezone.utc) + timedelta(seconds=seconds),
+        args=args,
+        id=f"duel_{duel_id}",
+        replace_existing=True,
+        misfire_grace_time=None
+    )
+
+
+def cancel_job(duel_id: str):
+    """取消决斗的定时任务，任务已执行、已取消或不在本进程时忽略"""
+    try:
+        # 决斗任务在默认的内存存储中，指定存储避免查询其他插件的持久化存储
+        scheduler.remove_job(f"duel_{duel_id}", jobstore="default")
+    except JobLookupError:
+        pass
 
 
-def check_duel_command(event: GroupMessageEvent) -> bool:
+@metrics.count_rule
+def check_duel_command(event: GroupMessageEvent, state: T_State) -> bool:
     """改进的决斗命令检查，匹配/决斗开头的消息"""
-    msg = event.get_plaintext().strip()
-    return bool(re.match(r"^决斗", msg))
+    return classifier.classify(event, state).text.startswith("决斗")
 
 
 duel_rule = Rule(check_duel_command)
 duel_matcher = on_message(rule=duel_rule, priority=10)
 
 
-async def check_confirmation(event: GroupMessageEvent) -> bool:
+@metrics.count_rule
+async def check_confirmation(event: GroupMessageEvent, state: T_State) -> bool:
     """检查是否是目标的确认消息"""
-    # 只处理有等待确认的群
-    if event.group_id not in pending_duels:
-        return False
-
-    # 检查发送者是否为被挑战者
-    duel_info = pending_duels.get(event.group_id)
-    if event.user_id != duel_info["target"]:
+    # 支持多种确认方式
+    if classifier.classify(event, state).lowered not in CONFIRM_WORDS:
         return False
 
-    # 支持多种确认方式
-    msg = event.get_plaintext().strip().lower()
-    return msg in {"接受", "确认", "y", "yes", "ok"}
+    # 只处理有等待确认的群，并检查发送者是否为被挑战者
+    duel_info = await pending_duels.get(event.group_id)
+    return bool(duel_info) and event.user_id == duel_info["target"]
 
 
 confirm_matcher = on_message(rule=Rule(check_confirmation), priority=15)
 
 
 @duel_matcher.handle()
-async def handle_duel(event: GroupMessageEvent, matcher: Matcher):
-    async with duel_lock:
-        try:
-            # 解析消息
-            at_users = [
-                seg.data["qq"]
-                for seg in event.message
-                if seg.type == "at" and str(seg.data["qq"]) != str(event.self_id)
-            ]
-            if not at_users:
-                await matcher.finish("需要@你要决斗的对手！")
-
-            target_id = int(at_users[0])
-            group_id = event.group_id
-            starter_id = event.user_id
-
-            # 检查自我决斗
-            if starter_id == target_id:
-                await matcher.finish("你不能和自己决斗！")
-
-            # 检查已有决斗
-            if group_id in pending_duels or group_id in ongoing_duels:
-                await matcher.finish("当前已有进行中的决斗请求！")
-
-            # 保存等待确认的决斗
-            pending_duels[group_id] = {
-                "starter": starter_id,
-                "target": target_id,
-                "expire_task": None
-            }
-
-            # 发送确认请求
-            await matcher.send(
-                MessageSegment.at(target_id) +
-                Message(f" 你被发起了决斗挑战！\n"
-                        "请发送【接受】来确认决斗（30秒内有效）\n"
-                        "超时未确认将自动取消")
-            )
-
-            # 设置30秒确认超时
-            async def confirmation_timeout():
-                await asyncio.sleep(30)
-                async with duel_lock:
-                    if group_id in pending_duels:
-                        del pending_duels[group_id]
-                        await matcher.send(
-                            MessageSegment.at(starter_id) +
-                            Message(" 的决斗请求已超时取消")
-                        )
-
-            pending_duels[group_id]["expire_task"] = asyncio.create_task(confirmation_timeout())
+async def handle_duel(bot: Bot, event: GroupMessageEvent, matcher: Matcher):
+    # 解析消息
+    at_users = [
+        seg.data["qq"]
+        for seg in event.message
+        if seg.type == "at" and str(seg.data["qq"]) != str(event.self_id)
+    ]
+    if not at_users:
+        await matcher.finish("需要@你要决斗的对手！")
+
+    target_id = int(at_users[0])
+    group_id = event.group_id
+    starter_id = event.user_id
+
+    # 检查自我决斗
+    if starter_id == target_id:
+        await matcher.finish("你不能和自己决斗！")
+
+    # 检查已有决斗，保存等待确认的决斗（add 保证同一群只有一个请求）
+    duel_info = {
+        "id": uuid.uuid4().hex,
+        "starter": starter_id,
+        "target": target_id
+    }
+    if await ongoing_duels.get(group_id) or not await pending_duels.add(group_id, duel_info, ttl=PENDING_TTL):
+        await matcher.finish("当前已有进行中的决斗请求！")
+
+    # 设置30秒确认超时
+    schedule_after(30, duel_info["id"], confirmation_timeout, bot, group_id, duel_info)
 
-        except Exception as e:
-            logger.error(f"决斗请求异常: {str(e)}")
-            await matcher.finish("决斗请求处理失败，请稍后再试")
+    try:
+        # 发送确认请求
+        await outbound.send_group(
+            bot,
+            group_id,
+            MessageSegment.at(target_id) +
+            Message(f" 你被发起了决斗挑战！\n"
+                    "请发送【接受】来确认决斗（30秒内有效）\n"
+                    "超时未确认将自动取消")
+        )
+    except Exception as e:
+        logger.error(f"决斗请求异常: {str(e)}")
 
 
-async def duel_start_task(group_id: int, matcher: Matcher):
-    """开始决斗的定时任务"""
-    await asyncio.sleep(5)
-    async with duel_lock:
-        if group_id not in ongoing_duels:
-            return
+async def confirmation_timeout(bot: Bot, group_id: int, duel_info: dict):
+    """决斗请求的30秒确认超时"""
+    if await pending_duels.compare_and_delete(group_id, duel_info):
+        await outbound.send_group(
+            bot,
+            group_id,
+            MessageSegment.at(duel_info["starter"]) +
+            Message(" 的决斗请求已超时取消")
+        )
+
 
-        # 更新可开枪状态
-        ongoing_duels[group_id]["can_shoot"] = True
-        await matcher.send("🔥 开始！")
+async def duel_start_task(bot: Bot, group_id: int, duel_info: dict):
+    """开始决斗的定时任务"""
+    # 更新可开枪状态，并设置30秒超时
+    started = dict(duel_info, can_shoot=True)
+    if not await ongoing_duels.compare_and_set(group_id, duel_info, started, ttl=ONGOING_TTL):
+        return
+    schedule_after(30, duel_info["id"], duel_timeout, bot, group_id, started)
+    await outbound.send_group(bot, group_id, "🔥 开始！", outbound.PRIORITY_RESULT)
 
-        # 设置30秒超时
-        async def timeout_task():
-            await asyncio.sleep(30)
-            async with duel_lock:
-                if group_id in ongoing_duels:
-                    del ongoing_duels[group_id]
-                    await matcher.send("🕒 决斗超时，自动取消！")
 
-        ongoing_duels[group_id]["expire_task"] = asyncio.create_task(timeout_task())
+async def duel_timeout(bot: Bot, group_id: int, duel_info: dict):
+    """决斗开始后的30秒超时"""
+    if await ongoing_duels.compare_and_delete(group_id, duel_info):
+        await outbound.send_group(bot, group_id, "🕒 决斗超时，自动取消！")
 
 
 @confirm_matcher.handle()
-async def handle_confirmation(event: GroupMessageEvent, matcher: Matcher):
-    async with duel_lock:
-        try:
-            group_id = event.group_id
-            duel_info = pending_duels.get(group_id)
-
-            if not duel_info:
-                return
-
-            # 取消确认超时任务
-            if duel_info["expire_task"] and not duel_info["expire_task"].cancelled():
-                duel_info["expire_task"].cancel()
-
-            # 初始化决斗状态
-            ongoing_duels[group_id] = {
-                "starter": duel_info["starter"],
-                "target": duel_info["target"],
-                "can_shoot": False,  # 新增开枪许可状态
-                "expire_task": None
-            }
-            del pending_duels[group_id]
-
-            # 发送倒计时提示
-            await matcher.send(
-                Message("⚔ 决斗确认！\n") +
-                MessageSegment.at(duel_info["starter"]) +
-                Message(" vs ") +
-                MessageSegment.at(duel_info["target"]) +
-                Message("\n5秒后开始，提前开枪将直接判负！")
-            )
-
-            # 启动开始计时任务
-            asyncio.create_task(duel_start_task(group_id, matcher))
+async def handle_confirmation(bot: Bot, event: GroupMessageEvent, matcher: Matcher):
+    group_id = event.group_id
+    pending_info = await pending_duels.pop(group_id)
+    if not pending_info:
+        return
+
+    # 取消确认超时任务
+    cancel_job(pending_info["id"])
+
+    # 初始化决斗状态
+    duel_info = {
+        "id": pending_info["id"],
+        "starter": pending_info["starter"],
+        "target": pending_info["target"],
+        "can_shoot": False  # 新增开枪许可状态
+    }
+    await ongoing_duels.set(group_id, duel_info, ttl=ONGOING_TTL)
+    # 启动开始计时任务
+    schedule_after(5, duel_info["id"], duel_start_task, bot, group_id, duel_info)
 
-        except Exception as e:
-            logger.error(f"确认处理异常: {str(e)}")
-            await matcher.finish("决斗确认失败，请检查日志")
+    try:
+        # 发送倒计时提示
+        await outbound.send_group(
+            bot,
+            group_id,
+            Message("⚔ 决斗确认！\n") +
+            MessageSegment.at(duel_info["starter"]) +
+            Message(" vs ") +
+            MessageSegment.at(duel_info["target"]) +
+            Message("\n5秒后开始，提前开枪将直接判负！"),
+            outbound.PRIORITY_RESULT
+        )
+    except Exception as e:
+        logger.error(f"确认处理异常: {str(e)}")
 
 
-async def handle_early_shoot(shooter_id: int, group_id: int, matcher: Matcher):
-    """处理提前开枪"""
+async def handle_early_shoot(bot: Bot, shooter_id: int, group_id: int, duel_info: dict, matcher: Matcher):
+    """处理提前开枪（决斗状态已被清除，这里只做网络请求）"""
     logger.info(f"处理群 {group_id} 的提前开枪")
     try:
-            logger.info(f"处理群 {group_id} 的提前开枪")
-            duel_info = ongoing_duels.get(group_id)
-            if not duel_info:
-                logger.debug("决斗已结束，无需处理")
-                return
-
-            # 立即清除状态防止重复处理
-            if duel_info["expire_task"]:
-                duel_info["expire_task"].cancel()
-            del ongoing_duels[group_id]
-
-            # 构建消息
-            result_msg = MessageSegment.at(shooter_id) + Message(" 犯规！抢跑开枪！🚫\n")
-
-            # 获取胜者信息
-            winner_id = duel_info["starter"] if shooter_id == duel_info["target"] else duel_info["target"]
-            result_msg += MessageSegment.at(winner_id) + Message(" 自动获胜！🎉")
-
-            # 执行禁言
-            bot = get_bot()
-            try:
-                member_info = await bot.get_group_member_info(
+        # 构建消息
+        result_msg = MessageSegment.at(shooter_id) + Message(" 犯规！抢跑开枪！🚫\n")
+
+        # 获取胜者信息
+        winner_id = duel_info["starter"] if shooter_id == duel_info["target"] else duel_info["target"]
+        result_msg += MessageSegment.at(winner_id) + Message(" 自动获胜！🎉")
+
+        # 执行禁言
+        try:
+            role = await group_member.get_member_role(bot, group_id, shooter_id)
+            if role == "member":
+                await outbound.call(
+                    bot,
+                    "set_group_ban",
+                    priority=outbound.PRIORITY_RESULT,
+                    coalesce=True,
                     group_id=group_id,
-                    user_id=shooter_id
+                    user_id=shooter_id,
+                    duration=120
                 )
-                if member_info["role"] == "member":
-                    await bot.set_group_ban(
-                        group_id=group_id,
-                        user_id=shooter_id,
-                        duration=120
-                    )
-                    result_msg += Message("\n⏳ 违规者已被禁言2分钟！")
-                    logger.info(f"成功禁言用户 {shooter_id}")
-                else:
-                    result_msg += Message("\n⚠️ 管理成员违规，本次不予禁言")
-            except ActionFailed as e:
-                logger.error(f"禁言失败: {str(e)}")
-                result_msg += Message("\n❌ 禁言失败（权限不足）")
-
-            await matcher.send(result_msg)
-            logger.info(f"提前开枪处理完成，群：{group_id}")
+                result_msg += Message("\n⏳ 违规者已被禁言2分钟！")
+                logger.info(f"成功禁言用户 {shooter_id}")
+            else:
+                result_msg += Message("\n⚠️ 管理成员违规，本次不予禁言")
+        except ActionFailed as e:
+            logger.error(f"禁言失败: {str(e)}")
+            result_msg += Message("\n❌ 禁言失败（权限不足）")
+
+        await outbound.send_group(bot, group_id, result_msg, outbound.PRIORITY_RESULT)
+        logger.info(f"提前开枪处理完成，群：{group_id}")
 
     except Exception as e:
-            logger.error(f"提前开枪处理异常: {str(e)}")
-            await matcher.finish("⚠️ 违规处理出错，请联系管理员")
+        logger.error(f"提前开枪处理异常: {str(e)}")
+        await matcher.finish("⚠️ 违规处理出错，请联系管理员")
 
 
 # 改进的射击检查规则
-async def shoot_checker(event: GroupMessageEvent) -> bool:
-    if event.group_id not in ongoing_duels:
-        return False
-
+@metrics.count_rule
+async def shoot_checker(event: GroupMessageEvent, state: T_State) -> bool:
     # 支持多种指令格式和容错
-    msg = event.get_plaintext().strip().lower()
-    return any(keyword in msg for keyword in ["开枪", "开抢", "bang", "shoot"])
+    if "shoot" not in classifier.classify(event, state).categories:
+        return False
+    return bool(await ongoing_duels.get(event.group_id))
 
 shoot_matcher = on_message(rule=Rule(shoot_checker), priority=15)
 
 @shoot_matcher.handle()
-async def handle_shoot(event: GroupMessageEvent, matcher: Matcher):
-    async with duel_lock:
+async def handle_shoot(bot: Bot, event: GroupMessageEvent, matcher: Matcher):
+    group_id = event.group_id
+    shooter_id = event.user_id
+
+    duel_info = await ongoing_duels.get(group_id)
+    if not duel_info:
+        return
+
+    early = not duel_info.get("can_shoot", False)
+    # 转换为字符串比较避免类型问题
+    participants = [duel_info["starter"], duel_info["target"]]
+    if not early and str(shooter_id) not in map(str, participants):
+        return
+
+    # 立即清除状态并取消超时任务，防止重复处理；清除失败说明已被其他消息处理
+    if not await ongoing_duels.compare_and_delete(group_id, duel_info):
+        return
+    cancel_job(duel_info["id"])
+    logger.debug(f"已取消群{group_id}的决斗计时任务")
+
+    # 检查是否允许开枪
+    if early:
+        logger.info(f"检测到提前开枪，用户：{shooter_id}")
+        await handle_early_shoot(bot, shooter_id, group_id, duel_info, matcher)
+        return
+
+    try:
+        # 确定胜负
+        winner_id = shooter_id
+        loser_id = duel_info["target"] if shooter_id == duel_info["starter"] else duel_info["starter"]
+
+        # 获取成员信息
         try:
-            group_id = event.group_id
-            shooter_id = event.user_id
-
-            if group_id not in ongoing_duels:
-                return
-
-            duel_info = ongoing_duels[group_id]
-            participants = [duel_info["starter"], duel_info["target"]]
-            # 检查是否允许开枪
-            if not duel_info.get("can_shoot", False):
-                logger.info(f"检测到提前开枪，用户：{shooter_id}")
-                await handle_early_shoot(shooter_id, group_id, matcher)
-                return
-            else:
-                # 转换为字符串比较避免类型问题
-                if str(shooter_id) not in map(str, participants):
-                    return
-
-                # 取消超时任务
-                if duel_info["expire_task"] and not duel_info["expire_task"].cancelled():
-                    duel_info["expire_task"].cancel()
-                    logger.debug(f"已取消群{group_id}的决斗超时任务")
-
-                # 确定胜负
-                winner_id = shooter_id
-                loser_id = duel_info["target"] if shooter_id == duel_info["starter"] else duel_info["starter"]
-
-                # 获取成员信息
-                bot = get_bot()
-                try:
-                    member_info = await bot.get_group_member_info(
-                        group_id=group_id,
-                        user_id=loser_id
-                    )
-                    role = member_info.get("role", "member")
-                except ActionFailed as e:
-                    logger.warning(f"获取成员信息失败: {str(e)}")
-                    role = "member"
-
-                result_msg = (
-                        MessageSegment.at(winner_id) +
-                        Message(" 抢先开枪！🏆\n") +
-                        MessageSegment.at(loser_id) +
-                        Message(" 输了！")
+            role = await group_member.get_member_role(bot, group_id, loser_id)
+        except ActionFailed as e:
+            logger.warning(f"获取成员信息失败: {str(e)}")
+            role = "member"
+
+        result_msg = (
+                MessageSegment.at(winner_id) +
+                Message(" 抢先开枪！🏆\n") +
+                MessageSegment.at(loser_id) +
+                Message(" 输了！")
+        )
+
+        # 禁言处理
+        try:
+            if role == "member":
+                await outbound.call(
+                    bot,
+                    "set_group_ban",
+                    priority=outbound.PRIORITY_RESULT,
+                    coalesce=True,
+                    group_id=group_id,
+                    user_id=loser_id,
+                    duration=60
                 )
-
-                # 禁言处理
-                try:
-                    if role == "member":
-                        await bot.set_group_ban(
-                            group_id=group_id,
-                            user_id=loser_id,
-                            duration=60
-                        )
-                        result_msg += Message("\n💢 失败者已被禁言1分钟！")
-                        logger.info(f"成功禁言 {loser_id} 于群 {group_id}")
-                    else:
-                        result_msg += Message("\n👑 由于失败者是管理员/群主，本次不禁言！")
-                except ActionFailed as e:
-                    logger.error(f"禁言失败: {str(e)}")
-                    result_msg += Message("\n⚠️ 禁言失败（权限不足）！")
-                except Exception as e:
-                    logger.error(f"未知错误: {str(e)}")
-                    result_msg += Message("\n❌ 处理禁言时发生未知错误！")
-
-            del ongoing_duels[group_id]
-            await matcher.send(result_msg)
+                result_msg += Message("\n💢 失败者已被禁言1分钟！")
+                logger.info(f"成功禁言 {loser_id} 于群 {group_id}")
+            else:
+                result_msg += Message("\n👑 由于失败者是管理员/群主，本次不禁言！")
+        except ActionFailed as e:
+            logger.error(f"禁言失败: {str(e)}")
+            result_msg += Message("\n⚠️ 禁言失败（权限不足）！")
         except Exception as e:
-            logger.error(f"开枪处理异常: {str(e)}")
-            await matcher.finish("决斗结果处理失败，请检查日志")
\ No newline at end of file
+            logger.error(f"未知错误: {str(e)}")
+            result_msg += Message("\n❌ 处理禁言时发生未知错误！")
+
+        await outbound.send_group(bot, group_id, result_msg, outbound.PRIORITY_RESULT)
+    except Exception as e:
+        logger.error(f"开枪处理异常: {str(e)}")
+        await matcher.finish("决斗结果处理失败，请检查日志")
@@ -0,0 +1,97 @@
+from nonebot import get_plugin_config, require
+from nonebot.plugin import PluginMetadata
+
+from .config import Config
+
+__plugin_meta__ = PluginMetadata(
+    name="group_member",
+    description="群成员身份缓存，供其他插件查询成员是否为群主/管理员",
+    usage="",
+    config=Config,
+)
+
+config = get_plugin_config(Config)
+
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple, Union
+
+from nonebot.adapters.onebot.v11 import (
+    Bot,
+    GroupMessageEvent,
+    GroupAdminNoticeEvent,
+    GroupDecreaseNoticeEvent
+)
+from nonebot.message import event_preprocessor
+
+outbound = require("outbound")
+
+# 缓存 {(群号, 用户ID): (身份, 过期时间)}，按最近使用排序
+_roles: "OrderedDict[Tuple[int, int], Tuple[str, float]]" = OrderedDict()
+
+
+def set_member_role(group_id: int, user_id: int, role: str):
+    """写入成员身份"""
+    key = (group_id, user_id)
+    _roles[key] = (role, time.monotonic() + config.group_member_cache_ttl)
+    _roles.move_to_end(key)
+    while len(_roles) > config.group_member_cache_size:
+        _roles.popitem(last=False)
+
+
+def get_cached_role(group_id: int, user_id: int) -> Optional[str]:
+    """只查缓存，未命中或已过期返回 None"""
+    key = (group_id, user_id)
+    cached = _roles.get(key)
+    if cached is None:
+        return None
+    role, expire_at = cached
+    if expire_at < time.monotonic():
+        del _roles[key]
+        return None
+    _roles.move_to_end(key)
+    return role
+
+
+def invalidate(group_id: int, user_id: Optional[int] = None):
+    """使某个成员（或整个群）的缓存失效"""
+    if user_id is not None:
+        _roles.pop((group_id, user_id), None)
+        return
+    for key in [key for key in _roles if key[0] == group_id]:
+        del _roles[key]
+
+
+async def get_member_role(bot: Bot, group_id: int, user_id: int) -> str:
+    """获取成员身份（owner/admin/member），优先使用缓存"""
+    role = get_cached_role(group_id, user_id)
+    if role is None:
+        member_info = await outbound.call(
+            bot,
+            "get_group_member_info",
+            priority=outbound.PRIORITY_RESULT,
+            coalesce=True,
+            group_id=group_id,
+            user_id=user_id
+        )
+        role = member_info.get("role", "member")
+        set_member_role(group_id, user_id, role)
+    return role
+
+
+@event_preprocessor
+async def _record_sender_role(event: GroupMessageEvent):
+    # 群消息自带发送者身份，顺手写入缓存
+    if event.sender.role:
+        set_member_role(event.group_id, event.user_id, event.sender.role)
+
+
+@event_preprocessor
+async def _handle_member_notice(event: Union[GroupAdminNoticeEvent, GroupDecreaseNoticeEvent]):
+    if isinstance(event, GroupAdminNoticeEvent):
+        set_member_role(event.group_id, event.user_id, "admin" if event.sub_type == "set" else "member")
+    elif event.user_id == event.self_id:
+        # 机器人自己离开了群
+        invalidate(event.group_id)
+    else:
+        invalidate(event.group_id, event.user_id)
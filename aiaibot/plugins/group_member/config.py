@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+
+
+class Config(BaseModel):
+    """Plugin Config Here"""
+    # 群成员身份缓存的有效期（秒）
+    group_member_cache_ttl: int = 600
+    # 最多缓存的群成员数量，超出后淘汰最久未使用的
+    group_member_cache_size: int = 10000
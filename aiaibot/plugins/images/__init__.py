@@ -1,29 +1,58 @@
-from nonebot import get_plugin_config
+from nonebot import get_plugin_config, require
 from nonebot.plugin import PluginMetadata
 import nonebot
-from nonebot.adapters.onebot.v11 import Adapter as OneBotV11Adapter, GROUP_ADMIN, GROUP_OWNER
+from nonebot.adapters.onebot.v11 import GROUP_ADMIN, GROUP_OWNER
 from nonebot.adapters.onebot.v11 import MessageEvent
 from nonebot import on_message, on_command
 from nonebot.rule import Rule, to_me
 from nonebot.typing import T_State
 from pathlib import Path
 from nonebot.adapters.onebot.v11 import (
-    Adapter as OneBotV11Adapter,
+    Bot,
     MessageEvent,
     MessageSegment,
     GroupMessageEvent,
     Message
 )
 from nonebot.params import CommandArg
+from nonebot.exception import ActionFailed
+from nonebot.permission import SUPERUSER
+from nonebot.utils import run_sync
 import random
 from nonebot.log import logger
 from nonebot_plugin_orm import get_session
 
 from .config import Config
-from .encrypt import encrypt
+
+# 回复与图片经出站队列发送，受全局/按群限流；帮助等长文本使用低优先级
+outbound = require("outbound")
+# 消息预分类，每条消息只提取一次纯文本
+classifier = require("classifier")
+# 运行指标
+metrics = require("metrics")
 from .models_method import DetailManger
 from .models import Detail
-from .foldername import get_folder_name, get_all_folder_names, get_all_folder_extra_names
+from .catalog import get_catalog, invalidate
+from . import selection, sendref
+from .blobs import release, collect_garbage
+from .download import download_image
+from .phash import register_image, dedup_folder
+from .thumbnail import THUMB_DIR, get_variant, schedule_variant
+from .send import mount_image_route, build_image_segment, read_image_segment, send_mode
+from .foldername import (
+    get_folder_name,
+    get_all_folder_names,
+    get_all_folder_extra_names,
+    load_alias_index,
+    add_alias,
+    remove_alias,
+    is_known_alias,
+    search_aliases,
+    import_aliases,
+    unknown_folders,
+    export_aliases,
+)
+from .aliasio import parse_aliases, dump_aliases
 
 __plugin_meta__ = PluginMetadata(
     name="images",
@@ -36,21 +65,28 @@ config = get_plugin_config(Config)
 
 
 
-# 初始化 NoneBot
-nonebot.init()
-
-# 注册 OneBot V11 适配器
 driver = nonebot.get_driver()
-driver.register_adapter(OneBotV11Adapter)
 
 # 配置图片存储目录
 BASE_IMAGE_DIR = Path("data/images").resolve()
 BASE_IMAGE_DIR.mkdir(parents=True, exist_ok=True)
+mount_image_route(BASE_IMAGE_DIR, "/images")
+mount_image_route(THUMB_DIR, "/thumbs")
+
+
+@driver.on_startup
+async def _load_alias_index():
+    # 启动时加载别名索引，之后的查询不再访问数据库
+    await load_alias_index()
 
 
-async def check_valid_folder(event: MessageEvent) -> bool:
+@metrics.count_rule
+async def check_valid_folder(event: MessageEvent, state: T_State) -> bool:
     """检查消息是否为有效的图片文件夹名称"""
-    folder_name = event.get_plaintext().strip()
+    folder_name = classifier.classify(event, state).text
+    # 快速排除：不是已知别名的消息直接返回，不访问数据库和磁盘
+    if not is_known_alias(folder_name):
+        return False
     folder_name = await get_folder_name(folder_name)
     if not folder_name:
         return False
@@ -68,32 +104,49 @@ matcher = on_message(rule=Rule(check_valid_folder), priority=10, block=True)
 
 
 @matcher.handle()
-async def handle_image_request(event: MessageEvent):
+async def handle_image_request(bot: Bot, event: MessageEvent):
     folder_name = event.get_plaintext().strip()
     folder_name = await get_folder_name(folder_name)
-    target_dir = BASE_IMAGE_DIR / folder_name
-    # 支持的图片格式
-    valid_exts = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp'}
-
-    # 获取所有图片文件
-    images = [
-        f for f in target_dir.iterdir()
-        if f.is_file() and f.suffix.lower() in valid_exts
-    ]
-
-    if not images:
-        await matcher.finish(f"📂 文件夹 {folder_name} 中没有找到图片")
+    target_dir = (BASE_IMAGE_DIR / folder_name).resolve()
 
-    # 随机选择一张图片
-    selected_image = random.choice(images)
+    # 从缓存的文件列表中按本群的洗牌顺序选择一张图片
+    catalog = await get_catalog(target_dir)
+    scope = event.group_id if isinstance(event, GroupMessageEvent) else ("private", event.user_id)
+    image_name = selection.pick(scope, target_dir, catalog)
+    if not image_name:
+        await outbound.finish(bot, event, f"📂 文件夹 {folder_name} 中没有找到图片")
+    selected_image = target_dir / image_name
+
+    # 相同内容之前发送过时，直接引用 OneBot 端已上传的图片
+    ref = sendref.get_ref(selected_image)
+    if ref:
+        try:
+            await outbound.send(bot, event, MessageSegment.image(ref))
+            return
+        except ActionFailed as e:
+            logger.info(f"图片引用已失效，重新上传：{str(e)}")
+            sendref.forget(selected_image)
 
+    mode = send_mode()
     try:
-        # 读取图片并发送
-        with open(selected_image, "rb") as f:
-            image_data = f.read()
-        await matcher.send(MessageSegment.image(image_data))
+        # 优先发送压缩后的缩略图
+        send_path = await get_variant(selected_image)
+        result = await outbound.send(bot, event, await build_image_segment(send_path))
+    except ActionFailed as e:
+        # file/url 方式失败时（如 OneBot 实现无法访问该路径），回退为发送文件内容，仍发送缩略图
+        if mode == "bytes":
+            await outbound.finish(bot, event, f"❌ 图片发送失败：{str(e)}")
+        logger.warning(f"图片发送失败，回退为 bytes 方式：{str(e)}")
+        mode = "bytes"
+        try:
+            result = await outbound.send(bot, event, await read_image_segment(send_path))
+        except Exception as e:
+            await outbound.finish(bot, event, f"❌ 图片发送失败：{str(e)}")
     except Exception as e:
-        await matcher.finish(f"❌ 图片发送失败：{str(e)}")
+        await outbound.finish(bot, event, f"❌ 图片发送失败：{str(e)}")
+
+    # 在后台记录 OneBot 端的图片引用
+    sendref.schedule_record(bot, selected_image, result, mode)
 
 
 async def validate_folder(folder_name: str) -> Path:
@@ -112,42 +165,25 @@ async def validate_folder(folder_name: str) -> Path:
 
 
 
-def get_image_ext(content: bytes) -> str:
-    """通过文件头识别图片格式"""
-    if content.startswith(b"\xff\xd8"):
-        return "jpg"
-    elif content.startswith(b"\x89PNG"):
-        return "png"
-    elif content.startswith(b"GIF8"):
-        return "gif"
-    elif content.startswith(b"RIFF") and content[8:12] == b"WEBP":
-        return "webp"
-    elif content.startswith(b"BM"):
-        return "bmp"
-    return "dat"
-
-
-
-
 all_foldername = on_command("所有文件夹",priority=5, block=True)
 @all_foldername.handle()
-async def handle_all_image(event: MessageEvent, state: T_State):
+async def handle_all_image(bot: Bot, event: MessageEvent, state: T_State):
     try:
         msg = await get_all_folder_names()
-        await all_foldername.send(msg)
+        await outbound.send(bot, event, msg)
     except Exception as e:
-        await all_foldername.finish(f"⚠️ 数据库操作失败：{str(e)}")
+        await outbound.finish(bot, event, f"⚠️ 数据库操作失败：{str(e)}")
 
 all_folder_extra_name = on_command("其他",priority=5, block=True)
 @all_folder_extra_name.handle()
-async def handle_all_image(args: Message = CommandArg()):
+async def handle_all_image(bot: Bot, event: MessageEvent, args: Message = CommandArg()):
     command = args.extract_plain_text().strip()
     folder_name = str(command.split(" ")[0])
     try:
         msg = await get_all_folder_extra_names(folder_name)
-        await all_foldername.send(msg)
+        await outbound.send(bot, event, msg)
     except Exception as e:
-        await all_foldername.finish(f"⚠️ 数据库操作失败：{str(e)}")
+        await outbound.finish(bot, event, f"⚠️ 数据库操作失败：{str(e)}")
 
 
 
@@ -155,7 +191,6 @@ async def handle_all_image(args: Message = CommandArg()):
 
 
 from nonebot.adapters.onebot.v11 import (
-    Adapter as OneBotV11Adapter,
     MessageEvent,
     MessageSegment,
     GroupMessageEvent,
@@ -165,9 +200,7 @@ from nonebot import on_command
 from nonebot.params import CommandArg
 from nonebot.typing import T_State
 import re
-import httpx
-import hashlib
-import time
+import asyncio
 
 # 新增的图片保存处理器
 save_image = on_command("存图", priority=5, block=True,permission=GROUP_ADMIN | GROUP_OWNER)
@@ -183,96 +216,135 @@ async def get_referenced_image(event: MessageEvent) -> list:
 
 @save_image.handle()
 async def handle_save_image(
+        bot: Bot,
         event: GroupMessageEvent,
         state: T_State,
         args: Message = CommandArg()
 ):
     # 仅处理群聊消息
     if not isinstance(event, GroupMessageEvent):
-        await save_image.finish("⚠️ 请在群聊中使用存图功能")
+        await outbound.finish(bot, event, "⚠️ 请在群聊中使用存图功能")
 
     # 获取文件夹名称
     folder_name = args.extract_plain_text().strip()
     folder_name = await get_folder_name(folder_name)
 
+    suggestions = []
     if folder_name !=None:
         folder_name = folder_name
     else:
         folder_name = args.extract_plain_text().strip()
+        # 不是已知名称时会新建文件夹，找出相近的名称提醒用户
+        suggestions = search_aliases(folder_name, 3)
     if not folder_name:
-        await save_image.finish("📝 请使用格式：存图 文件夹名")
+        await outbound.finish(bot, event, "📝 请使用格式：存图 文件夹名")
 
     # 验证文件夹名称
     try:
         target_dir = await validate_folder(folder_name)
     except ValueError:
-        await save_image.finish("⚠️ 包含非法字符，请使用合法文件夹名称")
+        await outbound.finish(bot, event, "⚠️ 包含非法字符，请使用合法文件夹名称")
 
 
     try:
         async with (get_session() as db_session):
-            true_folder_name = folder_name + "-" + folder_name
-            id = await encrypt(true_folder_name)
-            existing_lanmsg = await DetailManger.get_Sign_by_student_id(
-                db_session, id)
+            existing_lanmsg = await DetailManger.get_alias(
+                db_session, folder_name, folder_name)
             if existing_lanmsg:  # 更新记录
                 logger.info(f"{folder_name}已存在")
             else:  # 创建新记录
                 try:
                     # 写入数据库
-
-                    print(id)
                     await DetailManger.create_signmsg(
                         db_session,
-                        id=id,
                         folder_name=folder_name,
                         extra_name=folder_name
                     )
+                    add_alias(folder_name, folder_name)
                     logger.info(f"创建文件夹数据: {folder_name}")
                 except Exception as e:
-                    await save_image.finish(f"⚠️ 数据库写入失败：{str(e)}")
+                    await outbound.finish(bot, event, f"⚠️ 数据库写入失败：{str(e)}")
     except Exception as e:
-        await save_image.finish(f"⚠️ 数据库操作失败：{str(e)}")
+        await outbound.finish(bot, event, f"⚠️ 数据库操作失败：{str(e)}")
 
     # 获取被引用的图片
     image_urls = await get_referenced_image(event)
     if not image_urls:
-        await save_image.finish("⚠️ 请先引用包含图片的消息")
+        await outbound.finish(bot, event, "⚠️ 请先引用包含图片的消息")
 
-    # 保存图片
-    success_count = 0
-    async with httpx.AsyncClient(timeout=30) as client:
-        for url in image_urls:
-            try:
-                resp = await client.get(url)
-                if resp.status_code != 200:
-                        continue
-
-                # 生成安全文件名
-                file_hash = hashlib.md5(resp.content).hexdigest()[:8]
-                timestamp = int(time.time())
-                file_ext = get_image_ext(resp.content)
-                file_name = f"{timestamp}_{file_hash}.{file_ext}"
-
-                # 保存文件
-                save_path = target_dir / file_name
-                with open(save_path, "wb") as f:
-                    f.write(resp.content)
-
-                success_count += 1
-            except Exception as e:
-                print(f"图片保存失败：{str(e)}")
-
-    await save_image.finish(
-        MessageSegment.at(event.user_id) +
-        MessageSegment.text(f" ✅ 成功保存 {success_count} 张图片到 {folder_name}")
+    # 并发下载并保存图片
+    results = await asyncio.gather(
+        *(save_one_image(url, target_dir) for url in image_urls),
+        return_exceptions=True
     )
+    success_count = 0
+    duplicate_count = 0
+    for result in results:
+        if isinstance(result, Exception):
+            logger.warning(f"图片保存失败：{str(result)}")
+        elif result == "saved":
+            success_count += 1
+        elif result == "duplicate":
+            duplicate_count += 1
+
+    if success_count or duplicate_count:
+        invalidate(target_dir)
+
+    msg = f" ✅ 成功保存 {success_count} 张图片到 {folder_name}"
+    if duplicate_count:
+        msg += f"，跳过 {duplicate_count} 张重复图片"
+    if suggestions:
+        msg += f"\n💡 已新建文件夹 {folder_name}，是不是想存到：" + "、".join(name for _, name in suggestions)
+    await outbound.finish(bot, event, MessageSegment.at(event.user_id) + MessageSegment.text(msg))
+
+
+async def save_one_image(url: str, target_dir: Path) -> str:
+    """下载一张图片并查重，返回 saved / duplicate / failed"""
+    stored = await download_image(url, target_dir)
+    if not stored:
+        return "failed"
+    if not stored.path:
+        # 文件夹中已有完全相同的图片
+        return "duplicate"
+    duplicate = await register_image(target_dir, stored.path)
+    if duplicate:
+        logger.info(f"图片与 {duplicate} 重复，已跳过")
+        await run_sync(release)(stored.path, stored.digest)
+        return "duplicate"
+    if stored.known:
+        logger.info(f"图片内容已存在，仅链接到 {target_dir.name}")
+    schedule_variant(stored.path)
+    return "saved"
+
+
+dedup = on_command("去重", priority=5, block=True, permission=SUPERUSER)
+
+@dedup.handle()
+async def handle_dedup(bot: Bot, event: MessageEvent, args: Message = CommandArg()):
+    folder_name = args.extract_plain_text().strip()
+    if folder_name:
+        folder_name = await get_folder_name(folder_name) or folder_name
+        target_dirs = [(BASE_IMAGE_DIR / folder_name).resolve()]
+        if BASE_IMAGE_DIR not in target_dirs[0].parents or not target_dirs[0].is_dir():
+            await outbound.finish(bot, event, f"⚠️ 文件夹 {folder_name} 不存在")
+    else:
+        target_dirs = [p for p in BASE_IMAGE_DIR.iterdir() if p.is_dir()]
+
+    msg = "去重完成：\n"
+    for target_dir in target_dirs:
+        removed = await dedup_folder(target_dir)
+        if removed:
+            invalidate(target_dir)
+            msg += f"{target_dir.name}：删除 {len(removed)} 张\n"
+    # 清理已没有文件夹引用的 blob
+    await run_sync(collect_garbage)()
+    await outbound.finish(bot, event, msg.strip())
 
 
 extra_name_add = on_command("其他名称", priority=5, block=True,permission=GROUP_ADMIN | GROUP_OWNER)
 
 @extra_name_add.handle()
-async def handle_extra_name(event: MessageEvent, state: T_State,args: Message = CommandArg()):
+async def handle_extra_name(bot: Bot, event: MessageEvent, state: T_State,args: Message = CommandArg()):
     async with (get_session() as db_session):
         command = args.extract_plain_text().strip()
         folder_name = str(command.split(" ")[0])
@@ -280,49 +352,115 @@ async def handle_extra_name(event: MessageEvent, state: T_State,args: Message =
         try:
             existing_lanmsg = await get_folder_name(folder_name)
             if existing_lanmsg == None:
-                await extra_name_add.send(f"⚠️ 文件夹 {folder_name} 不存在")
+                await outbound.send(bot, event, f"⚠️ 文件夹 {folder_name} 不存在")
             else:
-                id = await encrypt(folder_name + "-" + extra_name)
+                # 输入的可能是别名或规范形式，记录解析出的真实文件夹名
+                folder_name = existing_lanmsg
                 try:
-                    mag = await DetailManger.get_Sign_by_student_id(db_session, id)
+                    mag = await DetailManger.get_alias(db_session, folder_name, extra_name)
                     if mag:
-                        await extra_name_add.send(f"⚠️ 文件夹 {folder_name} 已存在其他名称 {extra_name}")
+                        await outbound.send(bot, event, f"⚠️ 文件夹 {folder_name} 已存在其他名称 {extra_name}")
                         return
                     await DetailManger.create_signmsg(
                         db_session,
-                        id=id,
                         folder_name=folder_name,
                         extra_name=extra_name
                     )
-                    await extra_name_add.send(f"已为 {folder_name} 文件夹添加其他名称 {extra_name}")
+                    add_alias(folder_name, extra_name)
+                    await outbound.send(bot, event, f"已为 {folder_name} 文件夹添加其他名称 {extra_name}")
                 except Exception as e:
-                    await extra_name_add.finish(f"⚠️ 数据库写入失败：{str(e)}")
+                    await outbound.finish(bot, event, f"⚠️ 数据库写入失败：{str(e)}")
         except Exception as e:
-            await extra_name_add.finish(f"⚠️ 数据库操作失败：{str(e)}")
+            await outbound.finish(bot, event, f"⚠️ 数据库操作失败：{str(e)}")
 
 
 extra_name_delete = on_command("删除", priority=5, block=True, permission=GROUP_ADMIN | GROUP_OWNER)
 @extra_name_delete.handle()
-async def handle_extra_name(event: MessageEvent, state: T_State,args: Message = CommandArg()):
+async def handle_extra_name(bot: Bot, event: MessageEvent, state: T_State,args: Message = CommandArg()):
     async with (get_session() as db_session):
         command = args.extract_plain_text().strip()
         folder_name = str(command.split(" ")[0])
         extra_name = str(command.split(" ")[1])
-        id = await encrypt(folder_name + "-" + extra_name)
         try:
-            mag = await DetailManger.get_Sign_by_student_id(db_session, id)
-            if not mag:
-                await extra_name_delete.send(f"{folder_name} 文件夹的其他名称 {extra_name} 不存在")
+            deleted = await DetailManger.delete_alias(db_session, folder_name, extra_name)
+            if not deleted:
+                await outbound.send(bot, event, f"{folder_name} 文件夹的其他名称 {extra_name} 不存在")
             else:
-                await DetailManger.delete_id(db_session, id)
-                await extra_name_delete.send(f"已为 {folder_name} 文件夹删除其他名称 {extra_name}")
+                await remove_alias(folder_name, extra_name)
+                await outbound.send(bot, event, f"已为 {folder_name} 文件夹删除其他名称 {extra_name}")
         except Exception as e:
-            await extra_name_delete.finish(f"⚠️ 数据库操作失败：{str(e)}")
+            await outbound.finish(bot, event, f"⚠️ 数据库操作失败：{str(e)}")
+
+
+alias_import = on_command("导入别名", priority=5, block=True, permission=SUPERUSER)
+
+@alias_import.handle()
+async def handle_alias_import(bot: Bot, event: MessageEvent, args: Message = CommandArg()):
+    text = args.extract_plain_text().strip()
+    if not text:
+        await outbound.finish(bot, event, "📝 请使用格式：导入别名 后接 CSV（每行：文件夹名,其他名称）或 JSON（{\"文件夹名\": [\"其他名称\", ...]}）")
+    try:
+        pairs, invalid = parse_aliases(text)
+    except ValueError as e:
+        await outbound.finish(bot, event, f"⚠️ 格式错误：{str(e)}")
+    # 无效行只列出前几行，避免回复过长
+    invalid_msg = ""
+    if invalid:
+        invalid_msg = f"{len(invalid)} 行无效已跳过：\n" + "\n".join(invalid[:5])
+        if len(invalid) > 5:
+            invalid_msg += "\n……"
+    if not pairs:
+        await outbound.finish(bot, event, f"⚠️ 没有可导入的别名\n{invalid_msg}".strip())
+    # 导入前检查，导入后这些文件夹就出现在索引中了
+    unknown = unknown_folders(folder_name for folder_name, _ in pairs)
+    try:
+        inserted, reloaded = await import_aliases(pairs)
+    except Exception as e:
+        await outbound.finish(bot, event, f"⚠️ 数据库写入失败：{str(e)}")
+    msg = f"✅ 导入 {inserted} 个别名，{len(pairs) - inserted} 个已存在"
+    if invalid_msg:
+        msg += f"\n⚠️ {invalid_msg}"
+    if unknown:
+        msg += f"\n⚠️ 以下文件夹此前不存在，请确认没有写错：{'、'.join(unknown)}"
+    if not reloaded:
+        msg += "\n⚠️ 别名已写入数据库，但重新加载别名索引失败，重启后生效"
+    await outbound.finish(bot, event, msg)
+
+
+alias_export = on_command("导出别名", priority=5, block=True, permission=SUPERUSER)
+
+@alias_export.handle()
+async def handle_alias_export(bot: Bot, event: MessageEvent, args: Message = CommandArg()):
+    fmt = args.extract_plain_text().strip().lower() or "csv"
+    if fmt not in ("csv", "json"):
+        await outbound.finish(bot, event, "📝 请使用格式：导出别名 [csv|json]")
+    try:
+        pairs = await export_aliases()
+    except Exception as e:
+        await outbound.finish(bot, event, f"⚠️ 数据库操作失败：{str(e)}")
+    await outbound.send(bot, event, dump_aliases(pairs, fmt), outbound.PRIORITY_LOW)
+
+
+search_alias = on_command("搜索", priority=5, block=True)
+
+@search_alias.handle()
+async def handle_search_alias(bot: Bot, event: MessageEvent, args: Message = CommandArg()):
+    keyword = args.extract_plain_text().strip()
+    if not keyword:
+        await outbound.finish(bot, event, "📝 请使用格式：搜索 名称")
+    results = search_aliases(keyword)
+    if not results:
+        await outbound.finish(bot, event, f"没有找到与 {keyword} 相近的名称")
+    msg = "你是不是想找：\n" + "\n".join(
+        extra_name if extra_name == folder_name else f"{extra_name}（{folder_name}）"
+        for extra_name, folder_name in results
+    )
+    await outbound.finish(bot, event, msg)
 
 
 help = on_command("help", aliases={"帮助"},priority=5, block=True)
 @help.handle()
-async def handle_extra_name():
+async def handle_extra_name(bot: Bot, event: MessageEvent):
     msg = f"群图片bot使用指南：\n\
           1.上传的基本操作为：先引用所需上传的图片（支持上传一条信息里的多张图片），然后输入：存图 名称。\n\n\
           例如：存图 相羽爱奈（如有其他名称如：aiai，则可写为：存图 aiai）\n\n\
@@ -332,6 +470,7 @@ async def handle_extra_name():
           3.别名查询方法，输入命令：其他 要查询的文件夹名，例如：其他 相羽爱奈\n\n\
           4.增加别名，输入命令：其他名称 文件夹名 其他名称，例如：其他 相羽爱奈 aiai\n\n\
           5。查询图片，支持本名和别名查询，直接输入，bot会随机从图片库选取图片并发送。\n\n\
+          6.记不清名称时，输入命令：搜索 名称，bot会列出相近的名称，例如：搜索 aiai\n\n\
           tips：上传女声优图片时，如果bot返回信息中，存到的文件夹名称不是女声优本名而是输入的别名，则表示新创建了一个文件夹。不要慌张，请及时联系@Tano，我会及时处理。\n\n\
           特别感谢@相羽友希奈·噶吃·凑爱奈为丰富图片库做出的努力！！！"
-    await help.send(msg)
\ No newline at end of file
+    await outbound.send(bot, event, msg, outbound.PRIORITY_LOW)
\ No newline at end of file
@@ -0,0 +1,229 @@
+import bisect
+import heapq
+import itertools
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from nonebot.log import logger
+
+_SPACES = re.compile(r"\s+")
+# 模糊查找时最多计算编辑距离的候选数
+MAX_CANDIDATES = 32
+
+
+def normalize(text: str) -> str:
+    """别名的规范形式：全角转半角（NFKC）、大小写折叠、去掉空白"""
+    return _SPACES.sub("", unicodedata.normalize("NFKC", text).casefold())
+
+
+_pinyin_warned = False
+
+
+def pinyin_key(text: str) -> Optional[str]:
+    """别名的拼音形式，需要安装 pypinyin，不含汉字或未安装时返回 None"""
+    global _pinyin_warned
+    if not any("一" <= ch <= "鿿" for ch in text):
+        return None
+    try:
+        from pypinyin import lazy_pinyin
+    except ImportError:
+        if not _pinyin_warned:
+            logger.info("未安装 pypinyin，别名不支持拼音匹配")
+            _pinyin_warned = True
+        return None
+    return normalize("".join(lazy_pinyin(text)))
+
+
+def _grams(key: str) -> Set[str]:
+    """首尾补位的二元组，单个字符的别名也至少有两个"""
+    padded = f"\x02{key}\x03"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """编辑距离，只计算对角线附近 limit 宽的带状区域，超过 limit 时提前返回 limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    over = limit + 1
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        ca = a[i - 1]
+        low = max(1, i - limit)
+        high = min(len(b), i + limit)
+        current = [over] * (len(b) + 1)
+        current[0] = i if i <= limit else over
+        for j in range(low, high + 1):
+            cost = previous[j - 1] + (ca != b[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost
+        if min(current[low - 1:high + 1]) > limit:
+            return over
+        previous = current
+    return min(previous[-1], over)
+
+
+# 中日韩统一表意文字（含扩展 A）：规范化（NFKC、大小写折叠）前后不变，也不与前后字符组合
+_IDEOGRAPH_LOW = "\u3400"
+_IDEOGRAPH_HIGH = "\u9fff"
+
+
+class AliasIndex:
+    """别名索引：规范形式精确匹配、前缀查找与有限编辑距离的模糊查找
+
+    别名增删时增量更新，更新过程中没有 await，查询不会看到一半更新的状态。
+    同一个键可能来自多个别名（如 "AIAI" 与 "aiai"，或拼音相同的两个别名）：
+    规范形式优先于拼音，同类的先添加者优先，删除后由剩下的别名接替。
+    """
+    __slots__ = ("pinyin", "folders", "display", "owners", "sorted_keys", "grams", "max_len",
+                 "ideographs", "_seq")
+
+    def __init__(self, aliases: Dict[str, str], pinyin: bool = False):
+        self.pinyin = pinyin
+        # 规范形式 -> 文件夹名
+        self.folders: Dict[str, str] = {}
+        # 规范形式 -> 原始别名（用于回复）
+        self.display: Dict[str, str] = {}
+        # 规范形式 -> [(类别, 序号, 原始别名, 文件夹名)]，类别 0 为规范形式、1 为拼音
+        self.owners: Dict[str, List[Tuple[int, int, str, str]]] = {}
+        self.sorted_keys: List[str] = []
+        # 二元组 -> 含有该二元组的规范形式
+        self.grams: Dict[str, List[str]] = {}
+        # 键的最大长度与出现过的表意文字；删除别名时不回收，只会让快速排除略微宽松
+        self.max_len = 0
+        self.ideographs: Set[str] = set()
+        self._seq = itertools.count()
+        # 先登记全部规范形式，再登记拼音
+        for extra_name, folder_name in aliases.items():
+            self._claim(normalize(extra_name), 0, extra_name, folder_name)
+        if pinyin:
+            for extra_name, folder_name in aliases.items():
+                self._claim(pinyin_key(extra_name), 1, extra_name, folder_name)
+
+    def __len__(self) -> int:
+        return len(self.folders)
+
+    def _claim(self, key: Optional[str], kind: int, extra_name: str, folder_name: str):
+        if not key:
+            return
+        entry = (kind, next(self._seq), extra_name, folder_name)
+        owners = self.owners.get(key)
+        if owners is not None:
+            owners.append(entry)
+            self._elect(key)
+            return
+        self.owners[key] = [entry]
+        self._elect(key)
+        bisect.insort(self.sorted_keys, key)
+        for gram in _grams(key):
+            self.grams.setdefault(gram, []).append(key)
+        self.max_len = max(self.max_len, len(key))
+        self.ideographs.update(ch for ch in key if _IDEOGRAPH_LOW <= ch <= _IDEOGRAPH_HIGH)
+
+    def _release(self, key: Optional[str], extra_name: str):
+        owners = self.owners.get(key) if key else None
+        if owners is None:
+            return
+        owners[:] = [entry for entry in owners if entry[2] != extra_name]
+        if owners:
+            self._elect(key)
+            return
+        del self.owners[key], self.folders[key], self.display[key]
+        del self.sorted_keys[bisect.bisect_left(self.sorted_keys, key)]
+        for gram in _grams(key):
+            keys = self.grams[gram]
+            keys.remove(key)
+            if not keys:
+                del self.grams[gram]
+
+    def _elect(self, key: str):
+        _, _, extra_name, folder_name = min(self.owners[key])
+        self.folders[key] = folder_name
+        self.display[key] = extra_name
+
+    def add(self, extra_name: str, folder_name: str):
+        self._claim(normalize(extra_name), 0, extra_name, folder_name)
+        if self.pinyin:
+            self._claim(pinyin_key(extra_name), 1, extra_name, folder_name)
+
+    def remove(self, extra_name: str):
+        self._release(normalize(extra_name), extra_name)
+        if self.pinyin:
+            self._release(pinyin_key(extra_name), extra_name)
+
+    def excludes(self, text: str) -> bool:
+        """不做规范化的快速排除：过长，或以任何别名中都没有的汉字开头"""
+        # NFKC 可能把两个半角字符合成一个，长度留出余量
+        if len(text) > self.max_len * 2:
+            return True
+        first = text[:1]
+        return _IDEOGRAPH_LOW <= first <= _IDEOGRAPH_HIGH and first not in self.ideographs
+
+    def lookup(self, text: str) -> Optional[str]:
+        """按规范形式精确查找文件夹名"""
+        if self.excludes(text):
+            return None
+        return self.folders.get(normalize(text))
+
+    def prefix(self, key: str) -> Iterable[str]:
+        """以 key 开头的规范形式"""
+        start = bisect.bisect_left(self.sorted_keys, key)
+        for candidate in self.sorted_keys[start:]:
+            if not candidate.startswith(key):
+                break
+            yield candidate
+
+    def fuzzy(self, key: str, max_distance: int) -> List[Tuple[int, str]]:
+        """编辑距离不超过 max_distance 的 (距离, 规范形式)，按距离排序"""
+        grams = _grams(key)
+        # 每次编辑最多破坏两个二元组，共享的二元组太少的别名不必计算距离
+        counts: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self.grams.get(gram, ()):
+                counts[candidate] = counts.get(candidate, 0) + 1
+        need = len(grams) - 2 * max_distance
+        if need <= 0:
+            # 很短的查询：二元组过滤不起作用，退化为按长度筛选全部别名
+            candidates = [k for k in self.sorted_keys if abs(len(k) - len(key)) <= max_distance]
+        else:
+            candidates = [
+                k for k, count in counts.items()
+                if count >= need and abs(len(k) - len(key)) <= max_distance
+            ]
+        if len(candidates) > MAX_CANDIDATES:
+            # 只对共享二元组最多的一部分计算距离，保证查询耗时有上限
+            candidates = heapq.nsmallest(
+                MAX_CANDIDATES, candidates, key=lambda k: (-counts.get(k, 0), k)
+            )
+        results = []
+        for candidate in candidates:
+            distance = edit_distance(key, candidate, max_distance)
+            if distance <= max_distance:
+                results.append((distance, candidate))
+        results.sort()
+        return results
+
+    def search(self, text: str, max_distance: int, limit: int = 5) -> List[Tuple[str, str]]:
+        """“你是不是想找”：先精确，再前缀，再模糊，返回 [(原始别名, 文件夹名)]，同一文件夹只出现一次"""
+        key = normalize(text)
+        if not key:
+            return []
+        ordered = []
+        if key in self.folders:
+            ordered.append(key)
+        ordered.extend(self.prefix(key))
+        ordered.extend(candidate for _, candidate in self.fuzzy(key, max_distance))
+        results = []
+        seen = set()
+        for candidate in ordered:
+            folder_name = self.folders[candidate]
+            if folder_name in seen:
+                continue
+            seen.add(folder_name)
+            results.append((self.display[candidate], folder_name))
+            if len(results) >= limit:
+                break
+        return results
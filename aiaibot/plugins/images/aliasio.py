@@ -0,0 +1,102 @@
+import csv
+import io
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 文件夹名会作为目录名使用，不能含有这些字符
+_ILLEGAL = re.compile(r'[\\/:*?"<>|]')
+CSV_HEADER = ("folder_name", "extra_name")
+
+
+# 解析出的一行：(原始内容, 文件夹名, 别名)，文件夹名与别名在校验前可能是任意 JSON 值
+Row = Tuple[str, Any, Any]
+
+
+def _json_text(value) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _rows_from_json(data) -> Iterable[Row]:
+    # {"文件夹": ["别名", ...]} 或 {"文件夹": "别名"}
+    if isinstance(data, dict):
+        for folder_name, extra_names in data.items():
+            if not isinstance(extra_names, (list, tuple)):
+                extra_names = [extra_names]
+            for extra_name in extra_names:
+                yield f"{_json_text(folder_name)}: {_json_text(extra_name)}", folder_name, extra_name
+        return
+    if not isinstance(data, list):
+        raise ValueError("JSON 需为对象或数组")
+    for item in data:
+        # [{"folder_name": ..., "extra_name": ...}] 或 [["文件夹", "别名"]]
+        if isinstance(item, dict):
+            yield _json_text(item), item.get("folder_name"), item.get("extra_name")
+        elif isinstance(item, (list, tuple)) and len(item) == 2:
+            yield _json_text(item), item[0], item[1]
+        else:
+            yield _json_text(item), None, None
+
+
+def _rows_from_csv(text: str) -> Iterable[Row]:
+    for row in csv.reader(io.StringIO(text)):
+        if not any(cell.strip() for cell in row) or tuple(cell.strip() for cell in row[:2]) == CSV_HEADER:
+            continue
+        if len(row) < 2:
+            yield ",".join(row), None, None
+        else:
+            yield ",".join(row), row[0], row[1]
+
+
+def _valid_pair(folder_name, extra_name) -> Optional[Tuple[str, str]]:
+    if not isinstance(folder_name, str) or not isinstance(extra_name, str):
+        return None
+    folder_name = folder_name.strip()
+    extra_name = extra_name.strip()
+    if (
+        not folder_name or not extra_name
+        or len(folder_name) > 255 or len(extra_name) > 255
+        or _ILLEGAL.search(folder_name)
+    ):
+        return None
+    return folder_name, extra_name
+
+
+def parse_aliases(text: str, fmt: Optional[str] = None) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """解析 CSV 或 JSON 格式的别名列表，返回 ([(文件夹名, 别名)], [无效行的原始内容])
+
+    不指定格式时，以 [ 或 { 开头的视为 JSON，否则视为 CSV（两列：文件夹名,别名）。
+    文件夹名与别名须为非空字符串；JSON 数组中的每项须为含 folder_name/extra_name 的对象或两个元素的数组。
+    整体无法解析时抛出 ValueError。
+    """
+    text = text.lstrip("\ufeff").strip()
+    if fmt is None:
+        fmt = "json" if text[:1] in ("[", "{") else "csv"
+    rows = _rows_from_json(json.loads(text)) if fmt == "json" else _rows_from_csv(text)
+
+    pairs = []
+    seen = set()
+    invalid = []
+    for raw, folder_name, extra_name in rows:
+        pair = _valid_pair(folder_name, extra_name)
+        if pair is None:
+            invalid.append(raw)
+            continue
+        if pair not in seen:
+            seen.add(pair)
+            pairs.append(pair)
+    return pairs, invalid
+
+
+def dump_aliases(pairs: Iterable[Tuple[str, str]], fmt: str = "csv") -> str:
+    """导出别名列表，JSON 按文件夹分组"""
+    if fmt == "json":
+        grouped: Dict[str, List[str]] = {}
+        for folder_name, extra_name in pairs:
+            grouped.setdefault(folder_name, []).append(extra_name)
+        return json.dumps(grouped, ensure_ascii=False, indent=2)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(CSV_HEADER)
+    writer.writerows(pairs)
+    return buffer.getvalue()
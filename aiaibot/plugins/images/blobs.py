@@ -0,0 +1,128 @@
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+# 按内容寻址的图片库：data/blobs/ab/abcdef...（sha256），
+# data/images 下各文件夹中的图片是指向这里的硬链接，相同内容只占一份空间
+BLOB_DIR = Path("data/blobs").resolve()
+# 下载中的临时文件，与 blob 库在同一文件系统上以便原子重命名
+BLOB_TMP_DIR = BLOB_DIR / "tmp"
+
+# 计算文件哈希时每次读取的块大小
+CHUNK_SIZE = 1024 * 1024
+
+
+class StoredImage(NamedTuple):
+    # 文件夹中的图片路径，文件夹中已有相同内容时为 None
+    path: Optional[Path]
+    # 内容的 sha256
+    digest: str
+    # 内容在保存前是否已存在于 blob 库（此时只新增了链接）
+    known: bool
+
+
+def blob_path(digest: str) -> Path:
+    return BLOB_DIR / digest[:2] / digest
+
+
+def file_digest(path: Path) -> str:
+    """计算文件内容的 sha256"""
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def link_file(src: Path, dst: Path):
+    """在 dst 处创建 src 的硬链接（覆盖已有文件）
+
+    不支持硬链接（或 data/blobs 与 data/images 不在同一文件系统）时直接报错，不退化为复制：
+    复制出的文件与 blob 不再是同一个 inode，find_in_folder 找不到它，
+    collect_garbage 也会把仍被文件夹使用的 blob 当作未引用删除。
+    """
+    tmp = dst.with_name(f".{dst.name}.link")
+    try:
+        os.link(src, tmp)
+    except FileExistsError:
+        os.unlink(tmp)
+        os.link(src, tmp)
+    except OSError as e:
+        raise OSError(
+            e.errno,
+            f"无法创建硬链接 {src} -> {dst}（{e.strerror}），"
+            "data/blobs 与 data/images 需位于支持硬链接的同一文件系统",
+        ) from e
+    os.replace(tmp, dst)
+
+
+def find_in_folder(folder_dir: Path, digest: str) -> Optional[str]:
+    """查找文件夹中与 blob 为同一文件（硬链接）的图片，返回文件名"""
+    try:
+        stat = os.stat(blob_path(digest))
+    except FileNotFoundError:
+        return None
+    # 只有 blob 库自己持有链接时不必扫描文件夹
+    if stat.st_nlink <= 1:
+        return None
+    with os.scandir(folder_dir) as it:
+        for entry in it:
+            # scandir 提供的 inode 不需要额外的 stat 调用
+            if entry.inode() == stat.st_ino and not entry.name.startswith("."):
+                return entry.name
+    return None
+
+
+def store(tmp_path: Path, digest: str, ext: str, folder_dir: Path) -> StoredImage:
+    """把下载完成的临时文件放入 blob 库，并链接到目标文件夹
+
+    内容已存在时丢弃临时文件，只新增链接；文件夹中已有相同内容时不做任何改动。
+    """
+    blob = blob_path(digest)
+    known = blob.exists()
+    if known:
+        os.unlink(tmp_path)
+        if find_in_folder(folder_dir, digest):
+            return StoredImage(None, digest, True)
+    else:
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, blob)
+
+    save_path = folder_dir / f"{int(time.time())}_{digest[:8]}.{ext}"
+    link_file(blob, save_path)
+    return StoredImage(save_path, digest, known)
+
+
+def release(path: Path, digest: str):
+    """删除文件夹中的图片，blob 不再被任何文件夹引用时一并删除"""
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+    blob = blob_path(digest)
+    try:
+        if blob.stat().st_nlink <= 1:
+            blob.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def iter_blobs() -> Iterator[Path]:
+    if not BLOB_DIR.exists():
+        return
+    for prefix in BLOB_DIR.iterdir():
+        if prefix.is_dir() and prefix != BLOB_TMP_DIR:
+            yield from (p for p in prefix.iterdir() if p.is_file())
+
+
+def collect_garbage() -> int:
+    """删除没有被任何文件夹引用（硬链接数为 1）的 blob，返回释放的字节数"""
+    freed = 0
+    for blob in iter_blobs():
+        stat = blob.stat()
+        if stat.st_nlink <= 1:
+            blob.unlink()
+            freed += stat.st_size
+    return freed
@@ -0,0 +1,64 @@
+import os
+import random
+from array import array
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from nonebot.utils import run_sync
+
+# 支持的图片格式
+VALID_EXTS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp'}
+
+
+class FolderCatalog:
+    """单个图片文件夹的文件列表缓存（文件名 + 文件大小）"""
+    __slots__ = ("names", "sizes", "mtime_ns")
+
+    def __init__(self, names: Tuple[str, ...], sizes: array, mtime_ns: int):
+        self.names = names
+        self.sizes = sizes
+        self.mtime_ns = mtime_ns
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def pick(self) -> Optional[str]:
+        """随机选择一个文件名，O(1)"""
+        if not self.names:
+            return None
+        return self.names[random.randrange(len(self.names))]
+
+
+# 文件夹路径 -> 文件列表缓存
+_catalogs: Dict[Path, FolderCatalog] = {}
+
+
+@run_sync
+def _scan(folder_dir: Path, mtime_ns: int) -> FolderCatalog:
+    """扫描文件夹，生成文件列表（在线程中执行，不阻塞事件循环）"""
+    entries = []
+    with os.scandir(folder_dir) as it:
+        for entry in it:
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in VALID_EXTS:
+                entries.append((entry.name, entry.stat().st_size))
+    entries.sort()
+    return FolderCatalog(
+        tuple(name for name, _ in entries),
+        array("q", (size for _, size in entries)),
+        mtime_ns,
+    )
+
+
+async def get_catalog(folder_dir: Path) -> FolderCatalog:
+    """获取文件夹的文件列表，文件夹 mtime 未变化时直接使用缓存"""
+    mtime_ns = os.stat(folder_dir).st_mtime_ns
+    catalog = _catalogs.get(folder_dir)
+    if catalog is None or catalog.mtime_ns != mtime_ns:
+        catalog = await _scan(folder_dir, mtime_ns)
+        _catalogs[folder_dir] = catalog
+    return catalog
+
+
+def invalidate(folder_dir: Path):
+    """文件夹内容变化后使缓存失效"""
+    _catalogs.pop(folder_dir, None)
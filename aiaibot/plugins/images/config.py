@@ -1,5 +1,58 @@
+from typing import Literal, Optional
+
 from pydantic import BaseModel
 
 
 class Config(BaseModel):
     """Plugin Config Here"""
+    # 图片发送方式：
+    # bytes - 读取文件内容发送（默认，OneBot 实现不在本机时使用）
+    # file  - 发送 file:// 路径，OneBot 实现与 bot 共享文件系统时使用
+    # url   - 由 bot 的 HTTP 服务提供图片，OneBot 实现通过 images_base_url 下载
+    images_send_mode: Literal["bytes", "file", "url"] = "bytes"
+    # url 模式下 OneBot 实现访问 bot 的地址，例如 http://127.0.0.1:12045
+    images_base_url: Optional[str] = None
+    # 存图时同时下载的图片数量上限
+    images_download_concurrency: int = 4
+    # 单张图片下载超时（秒）
+    images_download_timeout: float = 30
+    # 存图时是否拒绝与已有图片相似的重复图片
+    images_dedup: bool = True
+    # 感知哈希汉明距离不超过该值即视为重复
+    images_dedup_distance: int = 4
+    # 是否在所有文件夹范围内查重（默认只在目标文件夹内查重）
+    images_dedup_global: bool = False
+    # 是否发送压缩后的缩略图（原图仍保存在 data/images 中）
+    images_thumbnail: bool = True
+    # 缩略图最长边（像素）
+    images_thumbnail_max_edge: int = 1280
+    # 缩略图格式与质量
+    images_thumbnail_format: Literal["jpeg", "webp"] = "jpeg"
+    images_thumbnail_quality: int = 85
+    # 小于该大小（字节）的图片直接发送原图
+    images_thumbnail_min_size: int = 512 * 1024
+    # 存图后立即生成缩略图（否则在第一次发送时生成）
+    images_thumbnail_eager: bool = True
+    # 生成缩略图的进程数
+    images_thumbnail_workers: int = 2
+    # 选图方式：deck - 每个群按洗牌顺序不重复地发送，一轮发完后重新洗牌；random - 每次独立随机
+    images_selection: Literal["deck", "random"] = "deck"
+    # 洗牌时的权重：none - 均匀；recency - 偏向较新保存的图片
+    images_selection_weight: Literal["none", "recency"] = "none"
+    # recency 权重下最新图片相对最旧图片多出的权重（最旧为 1）
+    images_selection_recency_boost: float = 3.0
+    # 最多保留的洗牌序列数（群 × 文件夹），超出时淘汰最久未使用的
+    images_selection_decks: int = 2000
+    # 是否复用 OneBot 端已上传图片的引用（发送后通过 get_msg 获取），相同内容再次发送时不再上传
+    # get_msg 同样经出站队列、占用限流配额，因此只在 file 模式下查询
+    images_send_ref: bool = True
+    # 图片引用的有效期（秒），部分实现返回的图片 URL 会过期
+    images_send_ref_ttl: int = 3600
+    # 最多缓存的图片引用数
+    images_send_ref_size: int = 5000
+    # 内存中缓存已编码图片数据（base64）的总字节数上限，0 表示不缓存
+    images_payload_cache_bytes: int = 64 * 1024 * 1024
+    # 别名是否同时按拼音匹配，需要另行安装 pypinyin（不在 requirements.txt 中）
+    images_alias_pinyin: bool = False
+    # 搜索别名时允许的最大编辑距离
+    images_alias_max_distance: int = 2
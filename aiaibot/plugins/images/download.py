@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from nonebot import get_driver, get_plugin_config, require
+from nonebot.utils import run_sync
+
+from .blobs import BLOB_TMP_DIR, StoredImage, store
+from .config import Config
+
+config = get_plugin_config(Config)
+metrics = require("metrics")
+
+if TYPE_CHECKING:
+    import httpx
+
+# 每次从网络读取的块大小
+CHUNK_SIZE = 64 * 1024
+
+# 共享的 HTTP 客户端与并发限制，首次使用时创建
+_client: Optional["httpx.AsyncClient"] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def get_client() -> "httpx.AsyncClient":
+    """获取共享的 HTTP 客户端（带连接池），httpx 在第一次存图时才导入"""
+    global _client, _semaphore
+    if _client is None:
+        import httpx
+
+        _client = httpx.AsyncClient(
+            timeout=config.images_download_timeout,
+            limits=httpx.Limits(
+                max_connections=config.images_download_concurrency * 2,
+                max_keepalive_connections=config.images_download_concurrency,
+            ),
+        )
+        _semaphore = asyncio.Semaphore(config.images_download_concurrency)
+    return _client
+
+
+@get_driver().on_shutdown
+async def _close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_image_ext(content: bytes) -> str:
+    """通过文件头识别图片格式"""
+    if content.startswith(b"\xff\xd8"):
+        return "jpg"
+    elif content.startswith(b"\x89PNG"):
+        return "png"
+    elif content.startswith(b"GIF8"):
+        return "gif"
+    elif content.startswith(b"RIFF") and content[8:12] == b"WEBP":
+        return "webp"
+    elif content.startswith(b"BM"):
+        return "bmp"
+    return "dat"
+
+
+@run_sync
+def _create_temp_file():
+    BLOB_TMP_DIR.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=BLOB_TMP_DIR, prefix=".", suffix=".part")
+    return os.fdopen(fd, "wb"), Path(tmp_path)
+
+
+@run_sync
+def _discard(path: Path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+# 入库操作串行执行，同一批次中相同内容的图片不会同时写入 blob
+_store_lock = asyncio.Lock()
+
+
+async def download_image(url: str, target_dir: Path) -> Optional[StoredImage]:
+    """下载单张图片并保存到目标文件夹
+
+    边下载边计算 sha256 并写入临时文件，完成后放入按内容寻址的 blob 库，
+    再以硬链接的形式出现在目标文件夹中；内容已存在时只新增链接。
+    磁盘写入在线程中执行，不阻塞事件循环。下载失败返回 None。
+    """
+    client = get_client()
+    async with _semaphore:
+        f, tmp_path = await _create_temp_file()
+        try:
+            sha256 = hashlib.sha256()
+            head = b""
+            async with client.stream("GET", url) as resp:
+                if resp.status_code != 200:
+                    await run_sync(f.close)()
+                    await _discard(tmp_path)
+                    return None
+                async for chunk in resp.aiter_bytes(CHUNK_SIZE):
+                    if len(head) < 12:
+                        head += chunk[:12 - len(head)]
+                    sha256.update(chunk)
+                    await run_sync(f.write)(chunk)
+                    metrics.add_fs_bytes("images", "write", len(chunk))
+            await run_sync(f.close)()
+
+            async with _store_lock:
+                return await run_sync(store)(tmp_path, sha256.hexdigest(), get_image_ext(head), target_dir)
+        except BaseException:
+            await run_sync(f.close)()
+            await _discard(tmp_path)
+            raise
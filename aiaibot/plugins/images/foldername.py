@@ -1,45 +1,126 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from nonebot import get_plugin_config
 from nonebot.log import logger
 from nonebot_plugin_orm import get_session
 
+from .aliasindex import AliasIndex
+from .config import Config
 from .models_method import DetailManger
 
-async def get_folder_name(msg):
+config = get_plugin_config(Config)
+
+# 别名 -> 文件夹名 的内存索引，启动时从数据库加载一次，由存图/其他名称/删除命令维护
+alias_index: Dict[str, str] = {}
+# 规范化后的别名索引（大小写、全半角、拼音），加载时整体构建，之后随别名增删增量更新
+normalized_index = AliasIndex({})
+
+
+def _rebuild():
+    global normalized_index
+    normalized_index = AliasIndex(alias_index, pinyin=config.images_alias_pinyin)
+
+
+async def load_alias_index() -> bool:
+    """从数据库一次性加载全部别名到内存索引，返回是否成功；失败时保留原有索引"""
     async with (get_session() as db_session):
         try:
-            sheet = await DetailManger.get_all_student_id(db_session)
-            for id in sheet:
-                data = await DetailManger.get_Sign_by_student_id(db_session, id)
-                if msg == data.extra_name:
-                    return data.folder_name
-            return None
+            pairs = await DetailManger.get_all_alias_pairs(db_session)
         except Exception as e:
-            logger.error(f"⚠️ 数据库操作失败：{str(e)}")
+            logger.error(f"⚠️ 别名索引加载失败：{str(e)}")
+            return False
+    index = {}
+    for folder_name, extra_name in pairs:
+        index.setdefault(extra_name, folder_name)
+    alias_index.clear()
+    alias_index.update(index)
+    _rebuild()
+    logger.info(f"已加载 {len(alias_index)} 个别名")
+    return True
+
+
+async def import_aliases(pairs: List[Tuple[str, str]]) -> Tuple[int, bool]:
+    """在一个事务中批量写入别名，之后整体重新加载内存索引
+
+    返回 (新写入的条数, 内存索引是否已重新加载)；重新加载失败时别名已写入数据库，
+    但在重启或下一次成功加载前查不到。
+    """
+    async with (get_session() as db_session):
+        inserted = await DetailManger.bulk_create_aliases(db_session, pairs)
+        await db_session.commit()
+    return inserted, await load_alias_index()
+
+
+def unknown_folders(folder_names: Iterable[str]) -> List[str]:
+    """还没有任何别名指向的文件夹名（通常是拼写错误，或者尚未存过图），按出现顺序去重"""
+    known: Set[str] = set(alias_index.values())
+    return [name for name in dict.fromkeys(folder_names) if name not in known]
+
+
+async def export_aliases() -> List[Tuple[str, str]]:
+    async with (get_session() as db_session):
+        return await DetailManger.get_all_alias_pairs(db_session)
+
+
+def add_alias(folder_name: str, extra_name: str):
+    """向内存索引中添加别名"""
+    if extra_name not in alias_index:
+        alias_index[extra_name] = folder_name
+        normalized_index.add(extra_name, folder_name)
+
+
+async def remove_alias(folder_name: str, extra_name: str):
+    """数据库中删除别名后同步内存索引
+
+    同一别名可能属于多个文件夹，索引中只记录最早添加的一个；删除它之后从数据库
+    重新查询该别名，其他文件夹的同名别名仍然有效。
+    """
+    if alias_index.get(extra_name) != folder_name:
+        return
+    async with (get_session() as db_session):
+        remaining = await DetailManger.get_folder_by_alias(db_session, extra_name)
+    normalized_index.remove(extra_name)
+    if remaining:
+        alias_index[extra_name] = remaining
+        normalized_index.add(extra_name, remaining)
+    else:
+        del alias_index[extra_name]
+
+
+def is_known_alias(msg: str) -> bool:
+    """不做任何 I/O 的快速判断，用于在消息规则中排除普通聊天"""
+    return msg in alias_index or normalized_index.lookup(msg) is not None
+
+
+async def get_folder_name(msg) -> Optional[str]:
+    """按别名查找文件夹名，原样匹配失败时按规范形式（大小写、全半角、拼音）匹配"""
+    return alias_index.get(msg) or normalized_index.lookup(msg)
+
+
+def search_aliases(msg: str, limit: int = 5) -> List[Tuple[str, str]]:
+    """模糊查找相近的别名，返回 [(别名, 文件夹名)]"""
+    # 短别名允许的编辑距离更小，避免一两个字母就匹配到一大片
+    max_distance = min(config.images_alias_max_distance, max(1, len(msg) // 3))
+    return normalized_index.search(msg, max_distance, limit)
 
 
 async def get_all_folder_names():
     async with (get_session() as db_session):
         try:
             msg = "所有名称列表：\n"
-            sheet = await DetailManger.get_all_student_id(db_session)
-            folder_name = []
-            for id in sheet:
-                data = await DetailManger.get_Sign_by_student_id(db_session, id)
-                if data.folder_name not in folder_name:
-                    msg += f"{data.folder_name}\n"
-                    folder_name.append(data.folder_name)
+            for folder_name in await DetailManger.get_all_folder_names(db_session):
+                msg += f"{folder_name}\n"
             return msg
         except Exception as e:
             logger.error(f"⚠️ 数据库操作失败：{str(e)}")
 
+
 async def get_all_folder_extra_names(folder_name):
     async with (get_session() as db_session):
         try:
             msg = f"{folder_name}所有名称列表：\n"
-            sheet = await DetailManger.get_all_student_id(db_session)
-            for id in sheet:
-                data = await DetailManger.get_Sign_by_student_id(db_session, id)
-                if data.folder_name == folder_name:
-                    msg += f"{data.extra_name}\n"
+            for extra_name in await DetailManger.get_extra_names_by_folder(db_session, folder_name):
+                msg += f"{extra_name}\n"
             return msg
         except Exception as e:
-            logger.error(f"⚠️ 数据库操作失败：{str(e)}")
\ No newline at end of file
+            logger.error(f"⚠️ 数据库操作失败：{str(e)}")
@@ -0,0 +1,40 @@
+"""create Detail table
+
+迁移 ID: 3f1c2a9d7b40
+父迁移:
+创建时间: 2026-10-18 10:12:31.284617
+
+"""
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "3f1c2a9d7b40"
+down_revision: str | Sequence[str] | None = None
+branch_labels: str | Sequence[str] | None = ("images",)
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade(name: str = "") -> None:
+    if name:
+        return
+    # 已有部署中该表可能早已存在
+    if sa.inspect(op.get_bind()).has_table("Detail"):
+        return
+    op.create_table(
+        "Detail",
+        sa.Column("id", sa.String(length=255), nullable=True),
+        sa.Column("folder_name", sa.String(length=255), nullable=True),
+        sa.Column("extra_name", sa.String(length=255), nullable=True),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_Detail")),
+    )
+
+
+def downgrade(name: str = "") -> None:
+    if name:
+        return
+    op.drop_table("Detail")
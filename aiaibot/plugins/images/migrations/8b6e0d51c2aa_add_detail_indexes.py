@@ -0,0 +1,38 @@
+"""add indexes on Detail.folder_name and Detail.extra_name
+
+迁移 ID: 8b6e0d51c2aa
+父迁移: 3f1c2a9d7b40
+创建时间: 2026-10-18 10:20:07.915302
+
+"""
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "8b6e0d51c2aa"
+down_revision: str | Sequence[str] | None = "3f1c2a9d7b40"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade(name: str = "") -> None:
+    if name:
+        return
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("Detail")}
+    with op.batch_alter_table("Detail", schema=None) as batch_op:
+        if "ix_Detail_folder_name" not in existing:
+            batch_op.create_index(batch_op.f("ix_Detail_folder_name"), ["folder_name"], unique=False)
+        if "ix_Detail_extra_name" not in existing:
+            batch_op.create_index(batch_op.f("ix_Detail_extra_name"), ["extra_name"], unique=False)
+
+
+def downgrade(name: str = "") -> None:
+    if name:
+        return
+    with op.batch_alter_table("Detail", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_Detail_extra_name"))
+        batch_op.drop_index(batch_op.f("ix_Detail_folder_name"))
@@ -0,0 +1,87 @@
+"""Detail uses an integer primary key and a unique (folder_name, extra_name)
+
+迁移 ID: d41e7a6c93f5
+父迁移: 8b6e0d51c2aa
+创建时间: 2026-10-18 16:42:55.103728
+
+"""
+from __future__ import annotations
+
+import hashlib
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "d41e7a6c93f5"
+down_revision: str | Sequence[str] | None = "8b6e0d51c2aa"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def _read_pairs(order_by: str | None) -> list:
+    """读出全部 (folder_name, extra_name)，去掉空值与重复，保持原有插入顺序"""
+    bind = op.get_bind()
+    detail = sa.table("Detail", sa.column("folder_name"), sa.column("extra_name"))
+    query = sa.select(detail.c.folder_name, detail.c.extra_name)
+    if order_by:
+        query = query.order_by(sa.literal_column(order_by))
+    pairs = []
+    seen = set()
+    for folder_name, extra_name in bind.execute(query):
+        if folder_name is None or extra_name is None or (folder_name, extra_name) in seen:
+            continue
+        seen.add((folder_name, extra_name))
+        pairs.append((folder_name, extra_name))
+    return pairs
+
+
+def upgrade(name: str = "") -> None:
+    if name:
+        return
+    # 数据量只是别名表，读入内存后重建表，避免新旧表的约束名冲突
+    # 同一别名对应多个文件夹时以先写入的为准，SQLite 下按 rowid 保持顺序
+    pairs = _read_pairs("rowid" if op.get_bind().dialect.name == "sqlite" else None)
+    op.drop_table("Detail")
+    detail = op.create_table(
+        "Detail",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("folder_name", sa.String(length=255), nullable=False),
+        sa.Column("extra_name", sa.String(length=255), nullable=False),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_Detail")),
+        sa.UniqueConstraint("folder_name", "extra_name", name=op.f("uq_Detail_folder_name")),
+    )
+    with op.batch_alter_table("Detail", schema=None) as batch_op:
+        batch_op.create_index(batch_op.f("ix_Detail_extra_name"), ["extra_name"], unique=False)
+    if pairs:
+        op.bulk_insert(detail, [
+            {"folder_name": folder_name, "extra_name": extra_name}
+            for folder_name, extra_name in pairs
+        ])
+
+
+def downgrade(name: str = "") -> None:
+    if name:
+        return
+    pairs = _read_pairs("id")
+    op.drop_table("Detail")
+    detail = op.create_table(
+        "Detail",
+        sa.Column("id", sa.String(length=255), nullable=True),
+        sa.Column("folder_name", sa.String(length=255), nullable=True),
+        sa.Column("extra_name", sa.String(length=255), nullable=True),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_Detail")),
+    )
+    with op.batch_alter_table("Detail", schema=None) as batch_op:
+        batch_op.create_index(batch_op.f("ix_Detail_folder_name"), ["folder_name"], unique=False)
+        batch_op.create_index(batch_op.f("ix_Detail_extra_name"), ["extra_name"], unique=False)
+    if pairs:
+        op.bulk_insert(detail, [
+            {
+                "id": hashlib.md5(f"{folder_name}-{extra_name}".encode()).hexdigest(),
+                "folder_name": folder_name,
+                "extra_name": extra_name,
+            }
+            for folder_name, extra_name in pairs
+        ])
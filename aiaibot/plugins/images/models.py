@@ -1,10 +1,11 @@
 from nonebot_plugin_orm import Model
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, UniqueConstraint
 
 
 class Detail(Model):
     __tablename__ = "Detail"
-    id = Column(String(255), primary_key=True, nullable=True)  #id
-    folder_name = Column(String(255), nullable=True)  # 文件夹名
-    extra_name = Column(String(255), nullable=True)  # 额外信息
\ No newline at end of file
+    # (文件夹名, 别名) 唯一，同时作为按文件夹查询别名的索引
+    __table_args__ = (UniqueConstraint("folder_name", "extra_name"),)
+    id = Column(Integer, primary_key=True, autoincrement=True)  #id
+    folder_name = Column(String(255), nullable=False)  # 文件夹名
+    extra_name = Column(String(255), nullable=False, index=True)  # 其他名称
@@ -1,21 +1,55 @@
-from typing import Optional
+from typing import Iterable, Optional, Tuple
 from sqlalchemy import text
 from nonebot_plugin_orm import async_scoped_session
-from sqlalchemy import select
+from sqlalchemy import delete, insert, select, tuple_
 from .models import Detail
 
+# 批量写入时每条 INSERT 的行数（SQLite 旧版本单条语句最多 999 个参数）
+BULK_BATCH_SIZE = 400
+
 
 class DetailManger:
     @classmethod
-    async def get_all_student_id(cls, session: async_scoped_session) -> set:
-        """获取数据库中所有 student_id"""
-        result = await session.execute(select(Detail.id))
-        return {row[0] for row in result}
+    async def get_all_alias_pairs(cls, session: async_scoped_session) -> list:
+        """一次查询获取所有 (folder_name, extra_name)"""
+        result = await session.execute(
+            select(Detail.folder_name, Detail.extra_name).order_by(Detail.id)
+        )
+        return [(row[0], row[1]) for row in result]
+
+    @classmethod
+    async def get_all_folder_names(cls, session: async_scoped_session) -> list:
+        """一次查询获取所有不重复的 folder_name"""
+        result = await session.execute(
+            select(Detail.folder_name).distinct().order_by(Detail.folder_name)
+        )
+        return [row[0] for row in result]
 
     @classmethod
-    async def get_Sign_by_student_id(cls, session: async_scoped_session, student_id: str) -> Optional[Detail]:
-        """根据 student_id 获取单个信息"""
-        return await session.get(Detail, student_id)
+    async def get_extra_names_by_folder(cls, session: async_scoped_session, folder_name: str) -> list:
+        """一次查询获取某个文件夹的所有 extra_name"""
+        result = await session.execute(
+            select(Detail.extra_name)
+            .where(Detail.folder_name == folder_name)
+            .order_by(Detail.extra_name)
+        )
+        return [row[0] for row in result]
+
+    @classmethod
+    async def get_alias(cls, session: async_scoped_session, folder_name: str, extra_name: str) -> Optional[Detail]:
+        """根据 (文件夹名, 别名) 获取单条记录，走唯一约束的索引"""
+        result = await session.execute(
+            select(Detail).where(Detail.folder_name == folder_name, Detail.extra_name == extra_name)
+        )
+        return result.scalar_one_or_none()
+
+    @classmethod
+    async def get_folder_by_alias(cls, session: async_scoped_session, extra_name: str) -> Optional[str]:
+        """别名对应的文件夹名，多个文件夹使用同一别名时取最早添加的（与加载索引时一致）"""
+        result = await session.execute(
+            select(Detail.folder_name).where(Detail.extra_name == extra_name).order_by(Detail.id).limit(1)
+        )
+        return result.scalar_one_or_none()
 
     @staticmethod
     async def is_database_empty(db_session):
@@ -32,11 +66,47 @@ class DetailManger:
         return new_signmsg
 
     @classmethod
-    async def delete_id(cls, session: async_scoped_session, id: str) -> bool:
+    async def delete_alias(cls, session: async_scoped_session, folder_name: str, extra_name: str) -> bool:
         """删除数据"""
-        lanmsg = await cls.get_Sign_by_student_id(session, id)
-        if lanmsg:
-            await session.delete(lanmsg)
-            await session.commit()
-            return True
-        return False
\ No newline at end of file
+        result = await session.execute(
+            delete(Detail).where(Detail.folder_name == folder_name, Detail.extra_name == extra_name)
+        )
+        await session.commit()
+        return result.rowcount > 0
+
+    @classmethod
+    async def bulk_create_aliases(cls, session: async_scoped_session, pairs: Iterable[Tuple[str, str]]) -> int:
+        """批量写入 (folder_name, extra_name)，已存在的跳过，返回新写入的行数
+
+        不提交事务，由调用方在全部写入后统一提交。
+        """
+        rows = [{"folder_name": folder_name, "extra_name": extra_name} for folder_name, extra_name in pairs]
+        dialect = session.get_bind(Detail).dialect.name
+        inserted = 0
+        for start in range(0, len(rows), BULK_BATCH_SIZE):
+            batch = rows[start:start + BULK_BATCH_SIZE]
+            if dialect in ("sqlite", "postgresql"):
+                if dialect == "sqlite":
+                    from sqlalchemy.dialects.sqlite import insert as dialect_insert
+                else:
+                    from sqlalchemy.dialects.postgresql import insert as dialect_insert
+                stmt = dialect_insert(Detail).values(batch).on_conflict_do_nothing(
+                    index_elements=["folder_name", "extra_name"]
+                )
+            else:
+                # 其他数据库先查出已存在的记录再插入
+                existing = await session.execute(
+                    select(Detail.folder_name, Detail.extra_name).where(
+                        tuple_(Detail.folder_name, Detail.extra_name).in_(
+                            [(row["folder_name"], row["extra_name"]) for row in batch]
+                        )
+                    )
+                )
+                existing = set(existing.tuples())
+                batch = [row for row in batch if (row["folder_name"], row["extra_name"]) not in existing]
+                if not batch:
+                    continue
+                stmt = insert(Detail).values(batch)
+            result = await session.execute(stmt)
+            inserted += max(result.rowcount, 0)
+        return inserted
@@ -0,0 +1,61 @@
+import os
+from base64 import b64encode
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+from nonebot import get_plugin_config, require
+
+from .config import Config
+
+config = get_plugin_config(Config)
+metrics = require("metrics")
+
+payload_requests = metrics.register(metrics.Counter(
+    "aiaibot_images_payload_cache_total", "图片 base64 数据缓存的命中情况", ("result",)
+))
+
+
+class PayloadCache:
+    """按字节数限制总大小的 LRU 缓存，保存已编码为 base64:// 的图片数据"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        # {文件路径: (文件修改时间, 数据)}
+        self.items: "OrderedDict[Path, Tuple[int, str]]" = OrderedDict()
+
+    def get(self, path: Path, mtime_ns: int) -> Optional[str]:
+        cached = self.items.get(path)
+        if cached is None or cached[0] != mtime_ns:
+            payload_requests.inc("miss")
+            return None
+        self.items.move_to_end(path)
+        payload_requests.inc("hit")
+        return cached[1]
+
+    def put(self, path: Path, mtime_ns: int, payload: str):
+        # 单个文件超过总预算的 1/4 时不缓存，避免一张大图挤掉所有热门图片
+        if len(payload) * 4 > self.max_bytes:
+            return
+        old = self.items.pop(path, None)
+        if old is not None:
+            self.size -= len(old[1])
+        self.items[path] = (mtime_ns, payload)
+        self.size += len(payload)
+        while self.size > self.max_bytes:
+            _, (_, evicted) = self.items.popitem(last=False)
+            self.size -= len(evicted)
+
+
+cache = PayloadCache(config.images_payload_cache_bytes)
+metrics.gauge("aiaibot_images_payload_cache_bytes", "图片 base64 数据缓存占用的字节数", lambda: cache.size)
+metrics.gauge("aiaibot_images_payload_cache_items", "图片 base64 数据缓存的条目数", lambda: len(cache.items))
+
+
+def encode_file(path: Path) -> Tuple[int, str, int]:
+    """读取文件并编码为 base64://，返回 (修改时间, 数据, 读取字节数)；在线程中调用"""
+    with open(path, "rb") as f:
+        mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+        data = f.read()
+    return mtime_ns, "base64://" + b64encode(data).decode(), len(data)
@@ -0,0 +1,276 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from nonebot import get_plugin_config
+from nonebot.log import logger
+from nonebot.utils import run_sync
+
+from .catalog import VALID_EXTS
+from .config import Config
+
+config = get_plugin_config(Config)
+
+# 各文件夹感知哈希索引的持久化目录
+PHASH_DIR = Path("data/phash").resolve()
+
+
+def _distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def compute_hash(path: Path) -> int:
+    """计算图片的 64 位感知哈希（pHash）"""
+    import imagehash
+    from PIL import Image
+
+    with Image.open(path) as image:
+        return int(str(imagehash.phash(image)), 16)
+
+
+class BKTree:
+    """按汉明距离组织的 BK 树，用于快速查找相近哈希"""
+    __slots__ = ("root",)
+
+    def __init__(self):
+        # 节点结构：(哈希, 文件名, {距离: 子节点})
+        self.root = None
+
+    def add(self, value: int, name: str):
+        if self.root is None:
+            self.root = (value, name, {})
+            return
+        node = self.root
+        while True:
+            d = _distance(node[0], value)
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = (value, name, {})
+                return
+            node = child
+
+    def find(self, value: int, max_distance: int) -> Iterator[Tuple[int, str]]:
+        """返回所有距离不超过 max_distance 的 (距离, 文件名)"""
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node_value, name, children = stack.pop()
+            d = _distance(node_value, value)
+            if d <= max_distance:
+                yield d, name
+            for child_distance, child in children.items():
+                if d - max_distance <= child_distance <= d + max_distance:
+                    stack.append(child)
+
+
+class PHashIndex:
+    """单个图片文件夹的感知哈希索引"""
+
+    def __init__(self, folder_dir: Path):
+        self.folder_dir = folder_dir
+        self.file = PHASH_DIR / f"{folder_dir.name}.json"
+        self.hashes: Dict[str, int] = {}
+        self.tree = BKTree()
+        # 创建时文件夹的去重代数，之后文件夹被重新去重时该索引的写入会被丢弃
+        self.generation = _generations.get(folder_dir, 0)
+        # 后台写入状态：正在写入时的新登记由同一个写入者在下一轮写入
+        self.saving = False
+        self.dirty = False
+
+    def add(self, name: str, value: int):
+        self.hashes[name] = value
+        self.tree.add(value, name)
+
+    def find(self, value: int, max_distance: int, exclude: Optional[str] = None) -> Optional[str]:
+        """查找相近的图片，已被删除的文件和 exclude（刚保存的图片自身）会被忽略"""
+        for _, name in sorted(self.tree.find(value, max_distance)):
+            if name == exclude:
+                continue
+            if name in self.hashes and (self.folder_dir / name).exists():
+                return name
+            self.hashes.pop(name, None)
+        return None
+
+    def load(self):
+        """读取持久化的索引，并补齐尚未计算哈希的图片"""
+        if self.file.exists():
+            for name, value in json.loads(self.file.read_text(encoding="utf-8")).items():
+                self.add(name, int(value, 16))
+        changed = False
+        for name in _list_images(self.folder_dir):
+            if name not in self.hashes:
+                try:
+                    self.add(name, compute_hash(self.folder_dir / name))
+                    changed = True
+                except Exception as e:
+                    logger.warning(f"计算图片哈希失败 {name}：{str(e)}")
+        if changed:
+            self.save()
+
+    def dump(self) -> str:
+        return json.dumps({name: f"{value:016x}" for name, value in self.hashes.items()})
+
+    def write(self, data: str):
+        PHASH_DIR.mkdir(parents=True, exist_ok=True)
+        # 临时文件名唯一，同时进行的写入（如 去重 命令与存图）不会互相覆盖临时文件
+        fd, tmp = tempfile.mkstemp(dir=PHASH_DIR, prefix=f".{self.file.stem}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            with _write_lock:
+                if self.generation != _generations.get(self.folder_dir, 0):
+                    # 文件夹已被重新去重，旧索引的内容不能覆盖新索引
+                    os.unlink(tmp)
+                    return
+                os.replace(tmp, self.file)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def save(self):
+        self.write(self.dump())
+
+    async def save_async(self):
+        """在事件循环中取快照、在线程中写入；并发登记时合并为尽量少的写入，最后一次写入总是最新内容"""
+        self.dirty = True
+        if self.saving:
+            return
+        self.saving = True
+        try:
+            while self.dirty:
+                self.dirty = False
+                await run_sync(self.write)(self.dump())
+        finally:
+            self.saving = False
+
+
+# 文件夹路径 -> 索引
+_indexes: Dict[Path, PHashIndex] = {}
+# 正在首次加载或去重的索引，同时存入同一文件夹的图片共用一次加载，避免重复计算整个文件夹的哈希
+_pending: Dict[Path, "asyncio.Future[PHashIndex]"] = {}
+# 文件夹路径 -> 去重代数，每次去重加一
+_generations: Dict[Path, int] = {}
+# 写入索引文件时检查代数与替换文件之间不能插入其他写入
+_write_lock = threading.Lock()
+
+
+def _list_images(folder_dir: Path) -> List[str]:
+    return sorted(
+        entry.name for entry in os.scandir(folder_dir)
+        if entry.is_file() and os.path.splitext(entry.name)[1].lower() in VALID_EXTS
+    )
+
+
+@run_sync
+def _list_folders(base_dir: Path) -> List[Path]:
+    return [p for p in base_dir.iterdir() if p.is_dir()]
+
+
+@run_sync
+def _load_index(folder_dir: Path) -> PHashIndex:
+    index = PHashIndex(folder_dir)
+    index.load()
+    return index
+
+
+def _start_pending(folder_dir: Path, awaitable) -> "asyncio.Future[PHashIndex]":
+    future = asyncio.ensure_future(awaitable)
+    _pending[folder_dir] = future
+    future.add_done_callback(lambda _: _pending.pop(folder_dir, None))
+    return future
+
+
+async def get_index(folder_dir: Path) -> PHashIndex:
+    """获取文件夹的哈希索引，首次使用时加载；正在去重时等待去重后的新索引"""
+    while True:
+        index = _indexes.get(folder_dir)
+        if index is not None:
+            return index
+        future = _pending.get(folder_dir)
+        if future is None:
+            future = _start_pending(folder_dir, _load_index(folder_dir))
+        index = await asyncio.shield(future)
+        if index.generation == _generations.get(folder_dir, 0):
+            return _indexes.setdefault(folder_dir, index)
+        # 加载期间文件夹开始了去重，改为等待去重后的索引
+
+
+async def register_image(folder_dir: Path, path: Path) -> Optional[str]:
+    """登记新保存的图片
+
+    如果库中已有相似图片，返回该图片的 "文件夹/文件名"（不登记）；否则登记并返回 None。
+    """
+    if not config.images_dedup:
+        return None
+    try:
+        value = await run_sync(compute_hash)(path)
+    except Exception as e:
+        logger.warning(f"计算图片哈希失败 {path.name}：{str(e)}")
+        return None
+
+    indexes = []
+    if config.images_dedup_global:
+        # 列目录与加载索引都在线程中进行
+        folders = [p for p in await _list_folders(folder_dir.parent) if p != folder_dir]
+        indexes = list(await asyncio.gather(*(get_index(p) for p in folders)))
+    # 最后获取本文件夹的索引，此后到登记之间没有 await，不会用到去重前的旧索引
+    own_index = await get_index(folder_dir)
+    indexes.insert(0, own_index)
+
+    # 查找与登记之间没有 await，同一批次中的重复图片也能被识别
+    # 索引首次加载时会扫描到刚保存的图片自身，查找时需排除
+    for index in indexes:
+        exclude = path.name if index is own_index else None
+        duplicate = index.find(value, config.images_dedup_distance, exclude)
+        if duplicate:
+            return f"{index.folder_dir.name}/{duplicate}"
+    if path.name not in own_index.hashes:
+        own_index.add(path.name, value)
+    await own_index.save_async()
+    return None
+
+
+@run_sync
+def _dedup_index(index: PHashIndex, removed: List[str]) -> PHashIndex:
+    folder_dir = index.folder_dir
+    for name in _list_images(folder_dir):
+        path = folder_dir / name
+        try:
+            value = compute_hash(path)
+        except Exception as e:
+            logger.warning(f"计算图片哈希失败 {name}：{str(e)}")
+            continue
+        if index.find(value, config.images_dedup_distance):
+            path.unlink()
+            removed.append(name)
+        else:
+            index.add(name, value)
+    # 去重期间新存入的图片只登记，不参与去重
+    for name in _list_images(folder_dir):
+        if name not in index.hashes:
+            try:
+                index.add(name, compute_hash(folder_dir / name))
+            except Exception as e:
+                logger.warning(f"计算图片哈希失败 {name}：{str(e)}")
+    index.save()
+    return index
+
+
+async def dedup_folder(folder_dir: Path) -> List[str]:
+    """离线去重：保留最早保存的图片，删除与之相似的图片，返回被删除的文件名
+
+    同一文件夹的加载与去重依次进行；去重开始后旧索引的写入被丢弃，存图等待去重后的新索引。
+    """
+    while (future := _pending.get(folder_dir)) is not None:
+        await asyncio.wait([future])
+    _generations[folder_dir] = _generations.get(folder_dir, 0) + 1
+    _indexes.pop(folder_dir, None)
+    removed: List[str] = []
+    index = await asyncio.shield(_start_pending(folder_dir, _dedup_index(PHashIndex(folder_dir), removed)))
+    if index.generation == _generations.get(folder_dir, 0):
+        _indexes.setdefault(folder_dir, index)
+    return removed
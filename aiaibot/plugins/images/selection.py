@@ -0,0 +1,88 @@
+import random
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Hashable, Optional, Tuple
+
+from nonebot import get_plugin_config
+
+from .catalog import FolderCatalog
+from .config import Config
+
+config = get_plugin_config(Config)
+
+
+def _shuffled(count: int) -> array:
+    """生成 0..count-1 的随机排列，按配置可偏向较新的图片"""
+    if config.images_selection_weight == "recency" and count > 1:
+        # 文件名以保存时间开头，序号越大越新；按权重做不放回抽样（Efraimidis-Spirakis）
+        boost = config.images_selection_recency_boost / (count - 1)
+        keys = [random.random() ** (1 / (1 + boost * i)) for i in range(count)]
+        return array("I", sorted(range(count), key=keys.__getitem__, reverse=True))
+    order = array("I", range(count))
+    random.shuffle(order)
+    return order
+
+
+class Deck:
+    """某个群在某个文件夹上的洗牌序列：一轮内每张图片只出现一次"""
+    __slots__ = ("names", "order", "pos")
+
+    def __init__(self, names: Tuple[str, ...]):
+        # 与 FolderCatalog 共享的文件名元组，只用于判断文件列表是否变化
+        self.names = names
+        self.order = _shuffled(len(names))
+        self.pos = 0
+
+    def sync(self, names: Tuple[str, ...]):
+        """文件列表变化后更新序列"""
+        old = self.names
+        self.names = names
+        if names == old:
+            return
+        if len(names) > len(old) and names[:len(old)] == old:
+            # 只新增了文件（新文件名排在最后）：把新序号随机插入本轮尚未发出的部分
+            for index in range(len(old), len(names)):
+                self.order.append(index)
+                swap = random.randint(self.pos, len(self.order) - 1)
+                self.order[swap], self.order[-1] = self.order[-1], self.order[swap]
+        else:
+            # 有文件被删除或改名，重新洗牌
+            self.order = _shuffled(len(names))
+            self.pos = 0
+
+    def draw(self) -> int:
+        if self.pos >= len(self.order):
+            last = self.order[-1]
+            self.order = _shuffled(len(self.names))
+            self.pos = 0
+            # 新一轮的第一张不与上一轮的最后一张相同
+            if len(self.order) > 1 and self.order[0] == last:
+                self.order[0], self.order[-1] = self.order[-1], self.order[0]
+        index = self.order[self.pos]
+        self.pos += 1
+        return index
+
+
+# (会话, 文件夹路径) -> 洗牌序列，按最近使用排序
+_decks: "OrderedDict[Tuple[Hashable, Path], Deck]" = OrderedDict()
+
+
+def pick(scope: Hashable, folder_dir: Path, catalog: FolderCatalog) -> Optional[str]:
+    """为某个会话（群号或私聊用户）从文件夹中选出下一张图片"""
+    if not catalog.names:
+        return None
+    if config.images_selection == "random":
+        return catalog.pick()
+
+    key = (scope, folder_dir)
+    deck = _decks.get(key)
+    if deck is None:
+        deck = _decks[key] = Deck(catalog.names)
+        while len(_decks) > config.images_selection_decks:
+            _decks.popitem(last=False)
+    else:
+        _decks.move_to_end(key)
+        if deck.names is not catalog.names:
+            deck.sync(catalog.names)
+    return catalog.names[deck.draw()]
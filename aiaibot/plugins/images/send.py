@@ -0,0 +1,85 @@
+import os
+from pathlib import Path
+from typing import Dict
+from urllib.parse import quote
+
+import nonebot
+from nonebot import get_plugin_config, require
+from nonebot.adapters.onebot.v11 import MessageSegment
+from nonebot.log import logger
+from nonebot.utils import run_sync
+
+from .config import Config
+from .payload import cache, encode_file
+
+config = get_plugin_config(Config)
+metrics = require("metrics")
+
+# url 模式下已挂载的目录 -> HTTP 路径前缀
+_routes: Dict[Path, str] = {}
+# 实际使用的发送方式：url 模式无法挂载图片目录时退回 bytes
+_send_mode = config.images_send_mode
+
+
+def send_mode() -> str:
+    return _send_mode
+
+
+def _fallback_to_bytes(reason: str):
+    global _send_mode
+    logger.warning(f"{reason}，将以 bytes 方式发送图片")
+    _send_mode = "bytes"
+    # 已挂载的目录也不再用于构造 URL，避免一部分图片发 URL、一部分发内容
+    _routes.clear()
+
+
+def mount_image_route(directory: Path, route: str):
+    """url 模式下在驱动的 ASGI 应用上挂载图片目录，失败时整体退回 bytes 模式"""
+    if _send_mode != "url":
+        return
+    if not config.images_base_url:
+        _fallback_to_bytes("images_send_mode=url 但未配置 images_base_url")
+        return
+    try:
+        from fastapi.staticfiles import StaticFiles
+        app = nonebot.get_app()
+        directory.mkdir(parents=True, exist_ok=True)
+        app.mount(route, StaticFiles(directory=directory), name=route.strip("/"))
+    except Exception as e:
+        _fallback_to_bytes(f"无法挂载图片 HTTP 服务 {route}：{str(e)}")
+        return
+    _routes[directory] = route
+
+
+async def read_image_segment(path: Path) -> MessageSegment:
+    """读取文件内容构造图片消息段
+
+    热门图片的 base64 数据保存在内存缓存中，读取和编码只在未命中时进行（在线程中）。
+    """
+    if config.images_payload_cache_bytes > 0:
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        if mtime_ns is not None:
+            payload = cache.get(path, mtime_ns)
+            if payload is not None:
+                return MessageSegment.image(payload)
+
+    mtime_ns, payload, size = await run_sync(encode_file)(path)
+    metrics.add_fs_bytes("images", "read", size)
+    if config.images_payload_cache_bytes > 0:
+        cache.put(path, mtime_ns, payload)
+    return MessageSegment.image(payload)
+
+
+async def build_image_segment(path: Path) -> MessageSegment:
+    """按配置的发送方式构造图片消息段"""
+    if _send_mode == "file":
+        return MessageSegment.image(path)
+    if _send_mode == "url":
+        for directory, route in _routes.items():
+            if directory in path.parents:
+                relative = quote(path.relative_to(directory).as_posix())
+                return MessageSegment.image(f"{config.images_base_url.rstrip('/')}{route}/{relative}")
+    return await read_image_segment(path)
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional, Set, Tuple
+
+from nonebot import get_plugin_config, require
+from nonebot.adapters.onebot.v11 import Bot, Message
+from nonebot.log import logger
+
+from .config import Config
+
+config = get_plugin_config(Config)
+outbound = require("outbound")
+metrics = require("metrics")
+
+send_ref_requests = metrics.register(metrics.Counter(
+    "aiaibot_images_send_ref_total", "按已上传引用发送图片的次数", ("result",)
+))
+
+# 图片内容标识：存图时相同内容的文件都硬链接到同一个 blob，inode 相同即内容相同
+ContentKey = Tuple[int, int, int]
+
+# {内容标识: (OneBot 端的图片引用, 过期时间)}，按最近使用排序
+_refs: "OrderedDict[ContentKey, Tuple[str, float]]" = OrderedDict()
+# 后台记录引用的任务，保留引用以免任务在完成前被回收
+_tasks: Set["asyncio.Task[None]"] = set()
+
+
+def content_key(path: Path) -> Optional[ContentKey]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_dev, stat.st_ino, stat.st_mtime_ns
+
+
+def get_ref(path: Path) -> Optional[str]:
+    """返回该图片之前发送后得到的可复用引用，没有或已过期时返回 None"""
+    if not config.images_send_ref:
+        return None
+    key = content_key(path)
+    cached = _refs.get(key) if key else None
+    if cached is None:
+        send_ref_requests.inc("miss")
+        return None
+    ref, expire_at = cached
+    if expire_at < time.monotonic():
+        del _refs[key]
+        send_ref_requests.inc("expired")
+        return None
+    _refs.move_to_end(key)
+    send_ref_requests.inc("hit")
+    return ref
+
+
+def forget(path: Path):
+    """引用失效（发送失败）时删除"""
+    key = content_key(path)
+    if key:
+        _refs.pop(key, None)
+    send_ref_requests.inc("failed")
+
+
+def _extract_ref(message: Any) -> Optional[str]:
+    """从 get_msg 返回的消息中取出图片引用"""
+    if isinstance(message, str):
+        segments = [{"type": seg.type, "data": seg.data} for seg in Message(message)]
+    else:
+        segments = message or []
+    for seg in segments:
+        if seg.get("type") != "image":
+            continue
+        data = seg.get("data") or {}
+        file = str(data.get("file") or "")
+        # go-cqhttp 等实现的缓存文件名可直接再次发送，否则使用图片 URL
+        if file.endswith(".image"):
+            return file
+        return data.get("url") or None
+    return None
+
+
+async def record(bot: Bot, path: Path, send_result: Any):
+    """发送成功后查询消息内容，记录 OneBot 端的图片引用，供之后发送同一内容时使用"""
+    if not config.images_send_ref or not isinstance(send_result, dict):
+        return
+    key = content_key(path)
+    message_id = send_result.get("message_id")
+    if key is None or message_id is None:
+        return
+    try:
+        result = await outbound.call(
+            bot, "get_msg", priority=outbound.PRIORITY_LOW, message_id=message_id
+        )
+    except Exception as e:
+        logger.debug(f"查询已发送图片失败：{str(e)}")
+        return
+    ref = _extract_ref(result.get("message") if isinstance(result, dict) else None)
+    if not ref:
+        return
+    _refs[key] = (ref, time.monotonic() + config.images_send_ref_ttl)
+    _refs.move_to_end(key)
+    while len(_refs) > config.images_send_ref_size:
+        _refs.popitem(last=False)
+
+
+def schedule_record(bot: Bot, path: Path, send_result: Any, mode: str):
+    """发送成功后在后台记录引用
+
+    查询引用要经出站队列多发一次 get_msg，占用限流配额；只在 file 模式下查询，
+    其他模式（bytes/url）发送的图片不记录引用。
+    """
+    if mode != "file":
+        return
+    task = asyncio.create_task(record(bot, path, send_result))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
@@ -0,0 +1,124 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from nonebot import get_driver, get_plugin_config
+from nonebot.log import logger
+
+from .config import Config
+
+config = get_plugin_config(Config)
+
+# 缩略图缓存目录，结构与 data/images 相同
+THUMB_DIR = Path("data/thumbs").resolve()
+
+_executor: Optional[ProcessPoolExecutor] = None
+# 正在生成中的缩略图，避免同一张图片被重复转码
+_pending: Dict[Path, "asyncio.Future[bool]"] = {}
+# 无法生成缩略图的原图（动图、无法解码）{原图路径: mtime_ns}，文件不变时不再尝试转码
+_skipped: Dict[Path, int] = {}
+# 存图后在后台生成缩略图的任务，保留引用以免任务在完成前被回收
+_tasks: Set["asyncio.Task[bool]"] = set()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=config.images_thumbnail_workers)
+    return _executor
+
+
+@get_driver().on_shutdown
+async def _shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _transcode(src: str, dst: str, max_edge: int, fmt: str, quality: int) -> bool:
+    """在子进程中生成缩略图，动图不处理"""
+    from PIL import Image
+
+    with Image.open(src) as image:
+        if getattr(image, "is_animated", False):
+            return False
+        image.thumbnail((max_edge, max_edge))
+        if fmt == "jpeg" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        tmp = f"{dst}.tmp"
+        image.save(tmp, format=fmt.upper(), quality=quality)
+    os.replace(tmp, dst)
+    return True
+
+
+def variant_path(path: Path) -> Path:
+    """原图对应的缩略图路径"""
+    ext = "jpg" if config.images_thumbnail_format == "jpeg" else config.images_thumbnail_format
+    return THUMB_DIR / path.parent.name / f"{path.stem}.{ext}"
+
+
+def _needs_variant(path: Path) -> bool:
+    if not config.images_thumbnail or path.suffix.lower() == ".gif":
+        return False
+    return path.stat().st_size >= config.images_thumbnail_min_size
+
+
+async def _generate(path: Path, dst: Path, mtime_ns: int) -> bool:
+    if _skipped.get(path) == mtime_ns:
+        return False
+    future = _pending.get(dst)
+    if future is None:
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        future = asyncio.get_running_loop().run_in_executor(
+            _get_executor(),
+            _transcode,
+            str(path),
+            str(dst),
+            config.images_thumbnail_max_edge,
+            config.images_thumbnail_format,
+            config.images_thumbnail_quality,
+        )
+        _pending[dst] = future
+        future.add_done_callback(lambda _: _pending.pop(dst, None))
+    try:
+        generated = await asyncio.shield(future)
+    except Exception as e:
+        logger.warning(f"生成缩略图失败 {path.name}：{str(e)}")
+        generated = False
+    if not generated:
+        _skipped[path] = mtime_ns
+    return generated
+
+
+async def get_variant(path: Path) -> Path:
+    """返回用于发送的文件：有缩略图时返回缩略图，否则返回原图"""
+    try:
+        if not _needs_variant(path):
+            return path
+        mtime_ns = path.stat().st_mtime_ns
+        if _skipped.get(path) == mtime_ns:
+            return path
+        dst = variant_path(path)
+        if dst.exists() and dst.stat().st_mtime_ns >= mtime_ns:
+            return dst
+    except OSError:
+        return path
+    return dst if await _generate(path, dst, mtime_ns) else path
+
+
+def schedule_variant(path: Path):
+    """存图后在后台预先生成缩略图"""
+    if not config.images_thumbnail_eager:
+        return
+    try:
+        if not _needs_variant(path):
+            return
+        mtime_ns = path.stat().st_mtime_ns
+    except OSError:
+        return
+    task = asyncio.create_task(_generate(path, variant_path(path), mtime_ns))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
@@ -0,0 +1,204 @@
+from nonebot import get_plugin_config
+from nonebot.plugin import PluginMetadata
+
+from .config import Config
+
+__plugin_meta__ = PluginMetadata(
+    name="metrics",
+    description="运行指标：处理器耗时、规则判定次数、SQL、文件读写与 OneBot API 延迟，以 Prometheus 文本格式导出",
+    usage="GET /metrics",
+    config=Config,
+)
+
+config = get_plugin_config(Config)
+
+import functools
+import inspect
+import secrets
+import time
+from typing import Any, Callable, Dict, Optional
+
+from nonebot import get_driver
+from nonebot.adapters import Bot
+from nonebot.log import logger
+from nonebot.matcher import Matcher, current_matcher
+from nonebot.message import run_postprocessor, run_preprocessor
+from nonebot.params import Depends
+from sqlalchemy import event as sa_event
+from sqlalchemy.engine import Engine
+
+from .registry import Counter, Gauge, Histogram
+
+driver = get_driver()
+
+handler_seconds = Histogram(
+    "aiaibot_handler_seconds", "事件处理器耗时", ("plugin", "handler", "result")
+)
+rule_evaluations = Counter(
+    "aiaibot_rule_evaluations_total", "规则判定次数", ("rule", "result")
+)
+sql_seconds = Histogram(
+    "aiaibot_sql_seconds", "SQL 语句耗时（按所在处理器归类）", ("handler",)
+)
+fs_bytes = Counter(
+    "aiaibot_fs_bytes_total", "文件读写字节数", ("plugin", "op")
+)
+api_seconds = Histogram(
+    "aiaibot_onebot_api_seconds", "OneBot API 调用耗时", ("api", "result")
+)
+
+_metrics = [handler_seconds, rule_evaluations, sql_seconds, fs_bytes, api_seconds]
+
+
+def register(metric):
+    """注册其他插件自己的指标（Counter/Histogram/Gauge）"""
+    _metrics.append(metric)
+    return metric
+
+
+def gauge(name: str, documentation: str, func: Callable[[], float]) -> Gauge:
+    """注册一个取值时调用 func 的仪表"""
+    return register(Gauge(name, documentation, func))
+
+
+def add_fs_bytes(plugin: str, op: str, amount: int):
+    """记录文件读（op="read"）写（op="write"）的字节数"""
+    fs_bytes.inc(plugin, op, amount=amount)
+
+
+def render() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def _handler_name(matcher: Matcher) -> str:
+    if not matcher.handlers:
+        return "unknown"
+    return getattr(matcher.handlers[0].call, "__name__", "unknown")
+
+
+# ---------- 规则判定次数 ----------
+
+def count_rule(func: Callable) -> Callable:
+    """
+    装饰规则函数，统计判定次数与通过次数。
+    保留原函数签名，NoneBot 的依赖注入不受影响。
+    """
+    name = f"{func.__module__}.{func.__name__}"
+    is_async = inspect.iscoroutinefunction(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        result = await func(*args, **kwargs) if is_async else func(*args, **kwargs)
+        rule_evaluations.inc(name, "pass" if result else "reject")
+        return result
+
+    return wrapper
+
+
+# ---------- 处理器耗时 ----------
+
+# {id(matcher): 开始时间}
+_handler_started: Dict[int, float] = {}
+
+
+async def _track_handler(matcher: Matcher):
+    key = id(matcher)
+    _handler_started[key] = time.perf_counter()
+    try:
+        yield
+    finally:
+        # 在事件处理结束时执行：其他预处理器忽略了本次处理、处理被取消等不会运行后处理器的情况下，
+        # 记录也会被删除
+        _handler_started.pop(key, None)
+
+
+@run_preprocessor
+async def _handler_start(_=Depends(_track_handler)):
+    pass
+
+
+@run_postprocessor
+async def _handler_done(matcher: Matcher, exception: Optional[Exception]):
+    started = _handler_started.pop(id(matcher), None)
+    if started is None:
+        return
+    handler_seconds.observe(
+        time.perf_counter() - started,
+        matcher.plugin_name or "unknown",
+        _handler_name(matcher),
+        "error" if exception else "ok",
+    )
+
+
+# ---------- SQL ----------
+# 监听所有 Engine，异步引擎的语句在 greenlet 中执行，会继承当前协程的上下文，
+# 因此可以通过 current_matcher 得知语句属于哪个处理器。
+
+@sa_event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_metrics_started", []).append(time.perf_counter())
+
+
+@sa_event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("_metrics_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    matcher = current_matcher.get(None)
+    sql_seconds.observe(elapsed, _handler_name(matcher) if matcher else "none")
+
+
+# ---------- OneBot API ----------
+
+# {id(data): 开始时间}，调用前后两个钩子拿到的是同一个 data 字典
+_api_started: Dict[int, float] = {}
+
+
+@Bot.on_calling_api
+async def _api_start(bot: Bot, api: str, data: Dict[str, Any]):
+    _api_started[id(data)] = time.perf_counter()
+
+
+@Bot.on_called_api
+async def _api_done(bot: Bot, exception: Optional[Exception], api: str, data: Dict[str, Any], result: Any):
+    started = _api_started.pop(id(data), None)
+    if started is None:
+        return
+    api_seconds.observe(time.perf_counter() - started, api, "error" if exception else "ok")
+
+
+# ---------- HTTP 导出 ----------
+
+def _authorized(authorization: str, client_host: Optional[str]) -> bool:
+    """配置了令牌时校验请求头，否则只允许本机访问"""
+    if config.metrics_token:
+        return secrets.compare_digest(authorization.encode(), f"Bearer {config.metrics_token}".encode())
+    return client_host in ("127.0.0.1", "::1")
+
+
+def _mount_route():
+    try:
+        from fastapi import FastAPI, Request
+        from fastapi.responses import PlainTextResponse
+        import nonebot
+        app = nonebot.get_app()
+    except Exception:
+        logger.info("当前驱动不提供 HTTP 服务，/metrics 未启用")
+        return
+    if not isinstance(app, FastAPI):
+        logger.info("当前驱动不是 FastAPI，/metrics 未启用")
+        return
+
+    @app.get(config.metrics_path, include_in_schema=False)
+    async def _metrics_endpoint(request: Request):
+        if not _authorized(request.headers.get("authorization", ""), request.client.host if request.client else None):
+            return PlainTextResponse("forbidden", status_code=403)
+        return PlainTextResponse(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+if config.metrics_enabled:
+    _mount_route()
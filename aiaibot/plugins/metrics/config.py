@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+
+
+class Config(BaseModel):
+    """Plugin Config Here"""
+    # 是否在驱动的 HTTP 服务上提供 /metrics
+    metrics_enabled: bool = True
+    # 指标的 HTTP 路径
+    metrics_path: str = "/metrics"
+    # 访问 /metrics 需要的令牌（请求头 Authorization: Bearer <令牌>）；
+    # 留空时只允许本机（127.0.0.1 / ::1）访问
+    metrics_token: str = ""
@@ -0,0 +1,256 @@
+import asyncio
+import heapq
+import itertools
+import json
+import time
+from typing import Any, Dict, List, NoReturn, Optional, Set
+
+from nonebot import get_driver, get_plugin_config
+from nonebot.adapters.onebot.v11 import Bot, Event, GroupMessageEvent, Message
+from nonebot.exception import ActionFailed, FinishedException, NetworkError
+from nonebot.log import logger
+from nonebot.plugin import PluginMetadata
+
+from .config import Config
+
+__plugin_meta__ = PluginMetadata(
+    name="outbound",
+    description="OneBot API 出站队列：按群/全局限流、优先级、失败重试与重复请求合并",
+    usage="",
+    config=Config,
+)
+
+config = get_plugin_config(Config)
+
+# 优先级：数值越小越先发送
+PRIORITY_RESULT = 0  # 游戏结果、禁言等
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10  # 帮助等长文本
+
+# 重复执行结果不变的写操作，可以重试与合并；查询类（get_*）同样视为幂等
+IDEMPOTENT_APIS = frozenset({
+    "set_group_ban",
+    "set_group_whole_ban",
+    "set_group_card",
+    "set_group_admin",
+})
+
+
+def is_idempotent(api: str) -> bool:
+    return api.startswith("get_") or api in IDEMPOTENT_APIS
+
+
+class TokenBucket:
+    """令牌桶"""
+    __slots__ = ("rate", "burst", "tokens", "updated_at")
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, now: float) -> float:
+        """距离下一个令牌可用的秒数"""
+        self.refill(now)
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class _Request:
+    __slots__ = ("bot", "api", "data", "group_id", "key", "retry", "future", "attempt", "not_before")
+
+    def __init__(self, bot: Bot, api: str, data: Dict[str, Any], key: Optional[str], retry: bool):
+        self.bot = bot
+        self.api = api
+        self.data = data
+        self.group_id = data.get("group_id")
+        self.key = key
+        self.retry = retry
+        self.future: "asyncio.Future[Any]" = asyncio.get_running_loop().create_future()
+        self.attempt = 0
+        self.not_before = 0.0
+
+
+_global_bucket = TokenBucket(config.outbound_global_rate, config.outbound_global_burst)
+_group_buckets: Dict[int, TokenBucket] = {}
+# 待发送请求的堆 (优先级, 序号, 请求)
+_queue: List[tuple] = []
+_counter = itertools.count()
+# 排队或执行中的可合并请求
+_inflight: Dict[str, _Request] = {}
+_wakeup: Optional[asyncio.Event] = None
+_dispatcher: Optional["asyncio.Task[None]"] = None
+# 执行中的调用，保留引用以免任务在完成前被回收，关闭时统一取消
+_executing: Set["asyncio.Task[None]"] = set()
+
+
+def _group_bucket(group_id: Optional[int]) -> Optional[TokenBucket]:
+    if group_id is None:
+        return None
+    bucket = _group_buckets.get(group_id)
+    if bucket is None:
+        bucket = _group_buckets[group_id] = TokenBucket(config.outbound_group_rate, config.outbound_group_burst)
+    return bucket
+
+
+def _coalesce_key(bot: Bot, api: str, data: Dict[str, Any]) -> str:
+    return f"{bot.self_id}:{api}:{json.dumps(data, sort_keys=True, default=str, ensure_ascii=False)}"
+
+
+def _enqueue(priority: int, request: _Request):
+    heapq.heappush(_queue, (priority, next(_counter), request))
+    _ensure_dispatcher().set()
+
+
+def _ensure_dispatcher() -> asyncio.Event:
+    global _wakeup, _dispatcher
+    if _wakeup is None:
+        _wakeup = asyncio.Event()
+    if _dispatcher is None or _dispatcher.done():
+        _dispatcher = asyncio.create_task(_dispatch())
+    return _wakeup
+
+
+async def _dispatch():
+    """按优先级取出可以发送的请求：全局令牌不足时等待，单个群令牌不足时先发其他群的请求"""
+    while True:
+        if not _queue:
+            _wakeup.clear()
+            await _wakeup.wait()
+            continue
+
+        now = time.monotonic()
+        delay = _global_bucket.wait_time(now)
+        if delay:
+            await _sleep_or_wakeup(delay)
+            continue
+
+        chosen = None
+        delay = None
+        for item in sorted(_queue):
+            request = item[2]
+            bucket = _group_bucket(request.group_id)
+            wait = max(request.not_before - now, bucket.wait_time(now) if bucket else 0)
+            if wait <= 0:
+                chosen = item
+                break
+            delay = wait if delay is None else min(delay, wait)
+        if chosen is None:
+            await _sleep_or_wakeup(delay)
+            continue
+
+        _queue.remove(chosen)
+        heapq.heapify(_queue)
+        _global_bucket.take()
+        bucket = _group_bucket(chosen[2].group_id)
+        if bucket:
+            bucket.take()
+        task = asyncio.create_task(_execute(chosen[0], chosen[2]))
+        _executing.add(task)
+        task.add_done_callback(_executing.discard)
+
+
+async def _sleep_or_wakeup(delay: float):
+    # 有新请求入队时提前醒来，高优先级请求可能可以立即发送
+    _wakeup.clear()
+    try:
+        await asyncio.wait_for(_wakeup.wait(), timeout=delay)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def _execute(priority: int, request: _Request):
+    try:
+        result = await request.bot.call_api(request.api, **request.data)
+    except asyncio.CancelledError:
+        # 关闭时被取消，等待结果的调用方随之取消
+        request.future.cancel()
+        raise
+    except (ActionFailed, NetworkError) as e:
+        # 非幂等的调用（如发送消息）失败时可能已经执行，重试会重复发送
+        if request.retry and request.attempt < config.outbound_max_retries:
+            request.attempt += 1
+            request.not_before = time.monotonic() + config.outbound_retry_delay * 2 ** (request.attempt - 1)
+            logger.warning(f"{request.api} 调用失败，第 {request.attempt} 次重试：{str(e)}")
+            _enqueue(priority, request)
+            return
+        _finish(request, exception=e)
+    except Exception as e:
+        _finish(request, exception=e)
+    else:
+        _finish(request, result=result)
+
+
+def _finish(request: _Request, result: Any = None, exception: Optional[BaseException] = None):
+    if request.key is not None and _inflight.get(request.key) is request:
+        del _inflight[request.key]
+    if request.future.done():
+        return
+    if exception is not None:
+        request.future.set_exception(exception)
+    else:
+        request.future.set_result(result)
+
+
+async def call(bot: Bot, api: str, *, priority: int = PRIORITY_NORMAL, coalesce: bool = False, **data: Any) -> Any:
+    """经出站队列调用 OneBot API
+
+    data 中含 group_id 时同时受该群的限流；coalesce 为 True 时，与正在排队或执行中的
+    完全相同的请求合并为一次调用，只应用于幂等的调用（如禁言、查询）。
+    幂等的调用失败后按配置重试，重试耗尽后抛出最后一次的异常；其他调用不重试。
+    """
+    idempotent = is_idempotent(api)
+    if coalesce and not idempotent:
+        raise ValueError(f"{api} 不是幂等调用，不能合并")
+    key = _coalesce_key(bot, api, data) if coalesce else None
+    request = _inflight.get(key) if key is not None else None
+    if request is None:
+        request = _Request(bot, api, data, key, idempotent)
+        if key is not None:
+            _inflight[key] = request
+        _enqueue(priority, request)
+    return await asyncio.shield(request.future)
+
+
+async def send(bot: Bot, event: Event, message, priority: int = PRIORITY_NORMAL) -> Any:
+    """回复事件所在的群聊/私聊"""
+    if not isinstance(message, Message):
+        message = Message(message)
+    if isinstance(event, GroupMessageEvent):
+        return await call(bot, "send_group_msg", priority=priority, group_id=event.group_id, message=message)
+    return await call(bot, "send_private_msg", priority=priority, user_id=int(event.get_user_id()), message=message)
+
+
+async def send_group(bot: Bot, group_id: int, message, priority: int = PRIORITY_NORMAL) -> Any:
+    """发送群消息"""
+    if not isinstance(message, Message):
+        message = Message(message)
+    return await call(bot, "send_group_msg", priority=priority, group_id=group_id, message=message)
+
+
+async def finish(bot: Bot, event: Event, message, priority: int = PRIORITY_NORMAL) -> NoReturn:
+    """经出站队列回复后结束事件处理，代替 matcher.finish"""
+    await send(bot, event, message, priority)
+    raise FinishedException
+
+
+@get_driver().on_shutdown
+async def _stop_dispatcher():
+    tasks = list(_executing)
+    if _dispatcher is not None:
+        tasks.append(_dispatcher)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    # 仍在排队的请求不再发送
+    for _, _, request in _queue:
+        request.future.cancel()
+    _queue.clear()
+    _inflight.clear()
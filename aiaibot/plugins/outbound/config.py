@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+
+
+class Config(BaseModel):
+    """Plugin Config Here"""
+    # 全局每秒请求数与突发上限
+    outbound_global_rate: float = 5
+    outbound_global_burst: int = 10
+    # 单个群每秒请求数与突发上限
+    outbound_group_rate: float = 1
+    outbound_group_burst: int = 5
+    # 幂等请求（禁言、查询等）失败后的重试次数与首次重试间隔（秒，之后每次翻倍），发送消息不重试
+    outbound_max_retries: int = 2
+    outbound_retry_delay: float = 1.0
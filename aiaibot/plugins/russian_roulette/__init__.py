@@ -1,4 +1,4 @@
-from nonebot import get_plugin_config
+from nonebot import get_plugin_config, require
 from nonebot import on_command
 from nonebot.adapters.onebot.v11 import (
     Bot,
@@ -6,6 +6,7 @@ from nonebot.adapters.onebot.v11 import (
     Message,
     MessageSegment
 )
+from nonebot.log import logger
 from nonebot.params import CommandArg
 import random
 from nonebot.plugin import PluginMetadata
@@ -26,8 +27,12 @@ config = get_plugin_config(Config)
 set_roulette = on_command("轮盘赌", priority=10)
 fire = on_command("开火", priority=10)
 
-# 存储游戏状态：{(群号, 用户ID): 子弹数量}
-roulette_games = {}
+# 禁言与结果经出站队列发送
+outbound = require("outbound")
+
+# 存储游戏状态：{"群号:用户ID": 子弹数量}，多个 worker 之间共享
+state_store = require("state_store")
+roulette_games = state_store.get_store("russian_roulette")
 
 
 @set_roulette.handle()
@@ -45,33 +50,50 @@ async def handle_set_roulette(event: GroupMessageEvent, args: Message = CommandA
         return
 
     # 存储游戏状态
-    game_key = (event.group_id, event.user_id)
-    roulette_games[game_key] = bullet_num
+    game_key = f"{event.group_id}:{event.user_id}"
+    await roulette_games.set(game_key, bullet_num)
     await set_roulette.finish(f"🔫 已装入 {bullet_num} 发子弹，发送【/开火】进行射击！")
 
 
 @fire.handle()
 async def handle_fire(event: GroupMessageEvent, bot: Bot):
     """处理开火命令"""
-    game_key = (event.group_id, event.user_id)
+    game_key = f"{event.group_id}:{event.user_id}"
 
-    if game_key not in roulette_games:
+    bullet_num = await roulette_games.pop(game_key)
+    if bullet_num is None:
         await fire.finish("⚠️ 请先使用【/轮盘赌 数字】装入子弹！")
         return
-
-    bullet_num = roulette_games.pop(game_key)
     rand = random.randint(50, 300)
 
     if rand <= bullet_num*50:
         try:
             # 禁言5分钟（300秒）
-            await bot.set_group_ban(
+            await outbound.call(
+                bot,
+                "set_group_ban",
+                priority=outbound.PRIORITY_RESULT,
+                coalesce=True,
                 group_id=event.group_id,
                 user_id=event.user_id,
                 duration=60
             )
-            await fire.send(MessageSegment.at(event.user_id) + "💥 砰！很不幸，你中弹了！（已被禁言1分钟）")
         except Exception as e:
-            await fire.send(f"⚠️ 禁言失败：{str(e)}")
+            await outbound.finish(bot, event, f"⚠️ 禁言失败：{str(e)}", outbound.PRIORITY_RESULT)
+        try:
+            await outbound.send_group(
+                bot,
+                event.group_id,
+                MessageSegment.at(event.user_id) + "💥 砰！很不幸，你中弹了！（已被禁言1分钟）",
+                outbound.PRIORITY_RESULT
+            )
+        except Exception as e:
+            # 禁言已生效，只是结果消息没有发出去
+            logger.warning(f"轮盘赌结果发送失败：{str(e)}")
     else:
-        await fire.send(MessageSegment.at(event.user_id) + "🔰 咔嗒～ 运气不错，这次是空枪！")
\ No newline at end of file
+        await outbound.send_group(
+            bot,
+            event.group_id,
+            MessageSegment.at(event.user_id) + "🔰 咔嗒～ 运气不错，这次是空枪！",
+            outbound.PRIORITY_RESULT
+        )
\ No newline at end of file
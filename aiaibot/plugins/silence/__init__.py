@@ -12,14 +12,55 @@ __plugin_meta__ = PluginMetadata(
 
 config = get_plugin_config(Config)
 
-from nonebot import on_message, get_bot
-from nonebot.adapters.onebot.v11 import GroupMessageEvent
+from nonebot import on_message, get_bot, get_driver, logger
+from nonebot.adapters.onebot.v11 import Bot, GroupMessageEvent
 from nonebot.rule import to_me
+from nonebot.utils import run_sync
+from sqlalchemy.engine import make_url
+import asyncio
 import datetime
+from typing import List, Optional, Tuple
 
 # 定时任务需要
 require("nonebot_plugin_apscheduler")
 from nonebot_plugin_apscheduler import scheduler
+# 任务存储默认保存在本插件的数据目录
+require("nonebot_plugin_localstore")
+
+# 禁言请求经出站队列发送
+outbound = require("outbound")
+
+driver = get_driver()
+
+# 重新禁言任务使用的持久化任务存储
+JOBSTORE = "silence"
+
+
+def _jobstore_url() -> str:
+    """持久化任务存储的地址，APScheduler 只支持同步驱动，需要去掉异步驱动名
+
+    未配置时使用本插件数据目录（nonebot_plugin_localstore）下单独的 SQLite 文件，
+    而不是 nonebot_plugin_orm 的数据库：关闭启动检查（ALEMBIC_STARTUP_CHECK=false）时，
+    ORM 启动时会按模型同步数据库模式，删除不属于任何模型的表，任务表会随之丢失。
+    """
+    if not config.silence_jobstore_url:
+        from nonebot_plugin_localstore import get_plugin_data_file
+        return f"sqlite:///{get_plugin_data_file('jobs.sqlite3')}"
+    url = make_url(config.silence_jobstore_url)
+    return url.set(drivername=url.drivername.split("+")[0]).render_as_string(hide_password=False)
+
+
+def _add_jobstore():
+    # 注意：SQLAlchemyJobStore 是同步实现，调度器到期检查任务时的查询在事件循环中执行；
+    # 任务表只有待重新禁言的成员，本地 SQLite 上每次只是一两条查询。
+    # 处理消息时的写入（添加任务）放到线程池中执行，见 schedule_rebans
+    from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+    url = _jobstore_url()
+    logger.info(f"重新禁言任务保存在 {make_url(url).render_as_string()}")
+    scheduler.add_jobstore(SQLAlchemyJobStore(url=url, tablename="silence_jobs"), alias=JOBSTORE)
+
+
+_add_jobstore()
 
 # 创建消息处理器，监听被@的群消息
 matcher = on_message(rule=to_me(), priority=10, block=True)
@@ -28,6 +69,30 @@ def is_admin(event: GroupMessageEvent) -> bool:
     """验证发送者是否为群主或管理员"""
     return event.sender.role in ["owner", "admin"]
 
+
+async def set_bans(bot: Bot, group_id: int, user_ids: List[int], duration: int) -> List[Tuple[int, Optional[Exception]]]:
+    """并发（限流）设置多个成员的禁言时长，返回每个成员的结果"""
+    semaphore = asyncio.Semaphore(config.silence_ban_concurrency)
+
+    async def _ban(user_id: int):
+        async with semaphore:
+            try:
+                await outbound.call(
+                    bot,
+                    "set_group_ban",
+                    priority=outbound.PRIORITY_RESULT,
+                    coalesce=True,
+                    group_id=group_id,
+                    user_id=user_id,
+                    duration=duration
+                )
+                return user_id, None
+            except Exception as e:
+                return user_id, e
+
+    return list(await asyncio.gather(*(_ban(user_id) for user_id in user_ids)))
+
+
 @matcher.handle()
 async def handle_unban(event: GroupMessageEvent):
     if not is_admin(event):
@@ -36,50 +101,78 @@ async def handle_unban(event: GroupMessageEvent):
     message = event.get_message()
 
     # 提取消息中的@用户（排除机器人自己）
-    target_users = [
+    target_users = list(dict.fromkeys(
         int(seg.data["qq"])
         for seg in message
         if seg.type == "at" and seg.data.get("qq") != str(event.self_id)
-    ]
+    ))
 
     if not target_users:
         await matcher.finish("请@需要解除禁言的成员")
 
-    target_id = target_users[0]  # 取第一个被@的用户
     group_id = event.group_id
 
-    try:
-        # 解除禁言
-        await get_bot().set_group_ban(
-            group_id=group_id,
-            user_id=target_id,
-            duration=0
-        )
-    except Exception as e:
-        await matcher.finish(f"解除禁言失败：{str(e)}")
-        return
+    # 解除禁言
+    results = await set_bans(get_bot(), group_id, target_users, 0)
+    succeeded = [user_id for user_id, error in results if error is None]
+    failed = [f"{user_id}：{str(error)}" for user_id, error in results if error is not None]
+
+    if not succeeded:
+        await matcher.finish("解除禁言失败：" + "；".join(failed))
+
+    # 添加定时任务（30分钟后执行），任务存储是同步的数据库写入，在线程池中执行
+    await run_sync(schedule_rebans)(group_id, succeeded)
 
     # 发送操作反馈
-    await matcher.send(f"已解除 {target_id} 的禁言，一定时间后将自动重新禁言")
+    msg = f"已解除 {'、'.join(map(str, succeeded))} 的禁言，一定时间后将自动重新禁言"
+    if failed:
+        msg += "\n解除禁言失败：" + "；".join(failed)
+    await matcher.send(msg)
+
+
+def schedule_rebans(group_id: int, user_ids: List[int]):
+    """30 分钟后重新禁言，同一成员再次解除时覆盖原任务
+
+    APScheduler 的任务操作是线程安全的，可以在线程池中调用。
+    """
+    run_date = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=30)
+    for user_id in user_ids:
+        scheduler.add_job(
+            reban_job,
+            "date",
+            run_date=run_date,
+            args=(group_id, user_id),
+            id=f"reban_{group_id}_{user_id}",
+            jobstore=JOBSTORE,
+            replace_existing=True,
+            coalesce=True,
+            misfire_grace_time=None
+        )
 
-    # 添加定时任务（30分钟后执行）
-    scheduler.add_job(
-        reban_job,
-        "date",
-        run_date=datetime.datetime.now() + datetime.timedelta(minutes=30),
-        args=(group_id, target_id),
-        id=f"reban_{group_id}_{target_id}"
-    )
+
+# 机器人未连接时到期的任务（例如重启后补执行的任务），连接后批量处理 {群号: [用户ID]}
+_pending_rebans: dict = {}
 
 
 async def reban_job(group_id: int, user_id: int):
     try:
-        # 重新禁言10天（864000秒）
-        await get_bot().set_group_ban(
-            group_id=group_id,
-            user_id=user_id,
-            duration=864000
-        )
-    except Exception as e:
-        # 这里可以添加日志记录
-        pass
\ No newline at end of file
+        bot = get_bot()
+    except ValueError:
+        _pending_rebans.setdefault(group_id, []).append(user_id)
+        return
+    await reban(bot, group_id, [user_id])
+
+
+async def reban(bot: Bot, group_id: int, user_ids: List[int]):
+    # 重新禁言10天（864000秒）
+    for user_id, error in await set_bans(bot, group_id, user_ids, 864000):
+        if error is not None:
+            logger.error(f"重新禁言失败 群{group_id} 用户{user_id}：{str(error)}")
+
+
+@driver.on_bot_connect
+async def _flush_pending_rebans(bot: Bot):
+    pending = dict(_pending_rebans)
+    _pending_rebans.clear()
+    for group_id, user_ids in pending.items():
+        await reban(bot, group_id, list(dict.fromkeys(user_ids)))
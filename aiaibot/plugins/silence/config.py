@@ -1,5 +1,12 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 
 class Config(BaseModel):
     """Plugin Config Here"""
+    # 重新禁言任务的持久化数据库，默认为本插件数据目录下的 jobs.sqlite3；
+    # 不要与关闭了启动检查的 nonebot_plugin_orm 共用数据库，ORM 同步模式时会删除任务表
+    silence_jobstore_url: Optional[str] = None
+    # 批量解除/重新禁言时同时进行的请求数
+    silence_ban_concurrency: int = 3
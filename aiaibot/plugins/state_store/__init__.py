@@ -0,0 +1,32 @@
+from nonebot import get_plugin_config
+from nonebot.plugin import PluginMetadata
+
+from .config import Config
+
+__plugin_meta__ = PluginMetadata(
+    name="state_store",
+    description="插件游戏状态的存储，支持进程内和跨进程（SQLite）两种后端",
+    usage="",
+    config=Config,
+)
+
+config = get_plugin_config(Config)
+
+from typing import Dict
+
+from .store import StateStore, MemoryStateStore, SQLiteStateStore
+
+# 命名空间 -> 存储
+_stores: Dict[str, StateStore] = {}
+
+
+def get_store(namespace: str) -> StateStore:
+    """获取某个命名空间的状态存储，后端由 state_store_backend 决定"""
+    store = _stores.get(namespace)
+    if store is None:
+        if config.state_store_backend == "sqlite":
+            store = SQLiteStateStore(namespace, config.state_store_path)
+        else:
+            store = MemoryStateStore(namespace)
+        _stores[namespace] = store
+    return store
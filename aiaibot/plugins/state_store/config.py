@@ -0,0 +1,13 @@
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+class Config(BaseModel):
+    """Plugin Config Here"""
+    # 插件状态的存储后端：
+    # memory - 进程内字典（默认，单 worker 使用）
+    # sqlite - WAL 模式的 SQLite 文件，多个 gunicorn worker 共享
+    state_store_backend: Literal["memory", "sqlite"] = "memory"
+    # sqlite 后端的数据库文件
+    state_store_path: str = "data/state.sqlite3"
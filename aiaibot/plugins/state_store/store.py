@@ -0,0 +1,239 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from nonebot.utils import run_sync
+
+
+class StateStore:
+    """键值状态存储
+
+    所有写操作都是原子的，跨进程时依靠 add / pop / compare_and_set / compare_and_delete
+    保证同一局游戏只会被处理一次。值必须可以被 JSON 序列化，取出的值不应原地修改。
+    ttl 为秒数，过期的键视为不存在。
+    """
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+
+    async def get(self, key) -> Optional[Any]:
+        raise NotImplementedError
+
+    async def set(self, key, value, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    async def add(self, key, value, ttl: Optional[float] = None) -> bool:
+        """键不存在时写入，返回是否写入成功"""
+        raise NotImplementedError
+
+    async def pop(self, key) -> Optional[Any]:
+        """取出并删除"""
+        raise NotImplementedError
+
+    async def compare_and_set(self, key, expected, value, ttl: Optional[float] = None) -> bool:
+        """当前值等于 expected 时替换为 value"""
+        raise NotImplementedError
+
+    async def compare_and_delete(self, key, expected) -> bool:
+        """当前值等于 expected 时删除"""
+        raise NotImplementedError
+
+
+def _expire_at(ttl: Optional[float]) -> Optional[float]:
+    return time.time() + ttl if ttl is not None else None
+
+
+# 过期键在读取时视为不存在，但只有被再次访问的键才会被删除；
+# 写入时顺带清理一次全部过期键，两次清理至少间隔这么多秒
+PURGE_INTERVAL = 60
+
+
+class MemoryStateStore(StateStore):
+    """进程内存储"""
+
+    def __init__(self, namespace: str):
+        super().__init__(namespace)
+        self._data: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self._purged_at = 0.0
+
+    def _purge(self):
+        now = time.time()
+        if now - self._purged_at < PURGE_INTERVAL:
+            return
+        self._purged_at = now
+        expired = [key for key, (_, expire_at) in self._data.items() if expire_at is not None and expire_at <= now]
+        for key in expired:
+            del self._data[key]
+
+    def _get(self, key: str) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expire_at = item
+        if expire_at is not None and expire_at <= time.time():
+            del self._data[key]
+            return None
+        return value
+
+    async def get(self, key) -> Optional[Any]:
+        return self._get(str(key))
+
+    async def set(self, key, value, ttl: Optional[float] = None):
+        self._purge()
+        self._data[str(key)] = (value, _expire_at(ttl))
+
+    async def add(self, key, value, ttl: Optional[float] = None) -> bool:
+        key = str(key)
+        if self._get(key) is not None:
+            return False
+        self._purge()
+        self._data[key] = (value, _expire_at(ttl))
+        return True
+
+    async def pop(self, key) -> Optional[Any]:
+        key = str(key)
+        value = self._get(key)
+        self._data.pop(key, None)
+        return value
+
+    async def compare_and_set(self, key, expected, value, ttl: Optional[float] = None) -> bool:
+        key = str(key)
+        if self._get(key) != expected:
+            return False
+        self._purge()
+        self._data[key] = (value, _expire_at(ttl))
+        return True
+
+    async def compare_and_delete(self, key, expected) -> bool:
+        key = str(key)
+        if self._get(key) != expected:
+            return False
+        del self._data[key]
+        return True
+
+
+class SQLiteStateStore(StateStore):
+    """基于 SQLite（WAL 模式）的跨进程存储，数据库操作在线程中执行
+
+    读写共用一个连接，由锁串行化；只读的 get 不开启写事务，WAL 模式下不会等待其他进程的写入。
+    """
+
+    _connections: Dict[str, sqlite3.Connection] = {}
+    # 数据库文件 -> 上次清理过期键的时间
+    _purged_at: Dict[str, float] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, namespace: str, path: str):
+        super().__init__(namespace)
+        self.path = str(Path(path).resolve())
+        with self._lock:
+            if self.path not in self._connections:
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS plugin_state ("
+                    "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expire_at REAL, "
+                    "PRIMARY KEY (namespace, key))"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS plugin_state_expire_at ON plugin_state (expire_at) "
+                    "WHERE expire_at IS NOT NULL"
+                )
+                self._connections[self.path] = conn
+        self._conn = self._connections[self.path]
+
+    @staticmethod
+    def _dumps(value) -> str:
+        # 固定键顺序，保证 compare_and_* 可以直接比较文本
+        return json.dumps(value, sort_keys=True, ensure_ascii=False)
+
+    def _execute(self, func):
+        """在写事务中执行 func(conn, now)；BEGIN IMMEDIATE 保证读取与写入之间不会插入其他进程的写入"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                result = func(self._conn, now)
+                self._purge(now)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def _read(self, func):
+        """不开启事务执行只读的 func(conn, now)，单条 SELECT 本身就是一致的快照"""
+        with self._lock:
+            return func(self._conn, time.time())
+
+    def _purge(self, now: float):
+        """在当前写事务中删除所有命名空间的过期键"""
+        if now - self._purged_at.get(self.path, 0.0) < PURGE_INTERVAL:
+            return
+        self._purged_at[self.path] = now
+        self._conn.execute("DELETE FROM plugin_state WHERE expire_at IS NOT NULL AND expire_at <= ?", (now,))
+
+    def _select(self, conn: sqlite3.Connection, key: str, now: float) -> Optional[str]:
+        row = conn.execute(
+            "SELECT value FROM plugin_state WHERE namespace = ? AND key = ? "
+            "AND (expire_at IS NULL OR expire_at > ?)",
+            (self.namespace, key, now),
+        ).fetchone()
+        return row[0] if row else None
+
+    def _write(self, conn: sqlite3.Connection, key: str, value, ttl: Optional[float]):
+        conn.execute(
+            "INSERT OR REPLACE INTO plugin_state (namespace, key, value, expire_at) VALUES (?, ?, ?, ?)",
+            (self.namespace, key, self._dumps(value), _expire_at(ttl)),
+        )
+
+    def _delete(self, conn: sqlite3.Connection, key: str):
+        conn.execute("DELETE FROM plugin_state WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    async def get(self, key) -> Optional[Any]:
+        raw = await run_sync(self._read)(lambda conn, now: self._select(conn, str(key), now))
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key, value, ttl: Optional[float] = None):
+        await run_sync(self._execute)(lambda conn, now: self._write(conn, str(key), value, ttl))
+
+    async def add(self, key, value, ttl: Optional[float] = None) -> bool:
+        def _add(conn, now):
+            if self._select(conn, str(key), now) is not None:
+                return False
+            self._write(conn, str(key), value, ttl)
+            return True
+
+        return await run_sync(self._execute)(_add)
+
+    async def pop(self, key) -> Optional[Any]:
+        def _pop(conn, now):
+            raw = self._select(conn, str(key), now)
+            self._delete(conn, str(key))
+            return raw
+
+        raw = await run_sync(self._execute)(_pop)
+        return json.loads(raw) if raw is not None else None
+
+    async def compare_and_set(self, key, expected, value, ttl: Optional[float] = None) -> bool:
+        def _cas(conn, now):
+            if self._select(conn, str(key), now) != self._dumps(expected):
+                return False
+            self._write(conn, str(key), value, ttl)
+            return True
+
+        return await run_sync(self._execute)(_cas)
+
+    async def compare_and_delete(self, key, expected) -> bool:
+        def _cad(conn, now):
+            if self._select(conn, str(key), now) != self._dumps(expected):
+                return False
+            self._delete(conn, str(key))
+            return True
+
+        return await run_sync(self._execute)(_cad)
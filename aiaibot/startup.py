@@ -0,0 +1,122 @@
+"""启动辅助：按 pyproject.toml 的 [tool.nonebot] 注册适配器、加载插件，并统计各插件的加载耗时"""
+import ast
+import importlib
+import pkgutil
+import time
+from pathlib import Path
+from typing import Dict, List, Set, Union
+
+import nonebot
+from nonebot.log import logger
+
+try:
+    import tomllib
+except ModuleNotFoundError:
+    import tomli as tomllib
+
+PLUGIN_DIR = Path(__file__).parent / "plugins"
+PYPROJECT = Path(__file__).parent.parent / "pyproject.toml"
+
+
+def _required_siblings(path: Path, names: Set[str]) -> Set[str]:
+    """插件源码中以字面量 require 的同目录插件"""
+    files = path.rglob("*.py") if path.is_dir() else [path]
+    required = set()
+    for file in files:
+        for node in ast.walk(ast.parse(file.read_bytes(), str(file))):
+            if not (isinstance(node, ast.Call) and len(node.args) == 1):
+                continue
+            func = node.func
+            func_name = func.id if isinstance(func, ast.Name) else getattr(func, "attr", None)
+            arg = node.args[0]
+            if func_name == "require" and isinstance(arg, ast.Constant) and arg.value in names:
+                required.add(arg.value)
+    return required
+
+
+def _load_order(plugins: Dict[str, Path]) -> List[str]:
+    """被 require 的插件排在前面，其余按名称排序"""
+    order: List[str] = []
+    visiting: Set[str] = set()
+
+    def visit(name: str):
+        if name in order or name in visiting:
+            # 循环依赖交给 NoneBot 报错
+            return
+        visiting.add(name)
+        for dependency in sorted(_required_siblings(plugins[name], set(plugins) - {name})):
+            visit(dependency)
+        visiting.discard(name)
+        order.append(name)
+
+    for name in sorted(plugins):
+        visit(name)
+    return order
+
+
+def load_plugins_timed(plugin_dir: Union[str, Path] = PLUGIN_DIR) -> Dict[str, float]:
+    """加载插件目录下的所有插件（以 _ 开头的除外），返回 {插件名: 加载耗时（秒）}
+
+    插件之间通过 require("插件名") 互相引用，而 nonebot.load_plugin 只认得已经加载的插件名，
+    所以先从源码中找出同目录插件之间的 require，按依赖顺序逐个加载。
+    耗时因此不含同目录的依赖（它们先加载、单独计时），但包含目录外的依赖（如 nonebot_plugin_orm）。
+    """
+    plugin_dir = Path(plugin_dir).resolve()
+    plugins: Dict[str, Path] = {}
+    for module_info in pkgutil.iter_modules([str(plugin_dir)]):
+        if module_info.name.startswith("_"):
+            continue
+        plugins[module_info.name] = (
+            plugin_dir / module_info.name if module_info.ispkg else plugin_dir / f"{module_info.name}.py"
+        )
+
+    timings: Dict[str, float] = {}
+    for name in _load_order(plugins):
+        start = time.perf_counter()
+        nonebot.load_plugin(plugins[name])
+        timings[name] = time.perf_counter() - start
+    return timings
+
+
+def load_from_toml_timed(file_path: Union[str, Path] = PYPROJECT) -> Dict[str, float]:
+    """按 [tool.nonebot] 注册 adapters，加载 builtin_plugins、plugins 与 plugin_dirs
+
+    与 nb-cli 生成的 bot.py 加 nonebot.load_from_toml 的效果相同，另外返回各插件的加载耗时。
+    plugin_dirs 与 NoneBot 一样按当前工作目录解析。
+    """
+    with open(file_path, "rb") as f:
+        data = tomllib.load(f).get("tool", {}).get("nonebot", {})
+
+    driver = nonebot.get_driver()
+    for adapter in data.get("adapters", []):
+        driver.register_adapter(importlib.import_module(adapter["module_name"]).Adapter)
+    nonebot.load_builtin_plugins(*data.get("builtin_plugins", []))
+
+    timings: Dict[str, float] = {}
+    for name in data.get("plugins", []):
+        start = time.perf_counter()
+        nonebot.load_plugin(name)
+        timings[name] = time.perf_counter() - start
+    for plugin_dir in data.get("plugin_dirs", []):
+        timings.update(load_plugins_timed(plugin_dir))
+    return timings
+
+
+def upgrade_database():
+    """把数据库升级到最新迁移，与 nb orm upgrade 相同
+
+    bot 启动时的迁移检查发现数据库落后时会等待确认，容器里没有终端会直接失败；
+    关闭检查则按模型同步表结构，遇到改了主键的迁移会重建表、丢掉数据。
+    所以在启动前先用这里升级。需在插件加载之后、事件循环之外调用。
+    """
+    from nonebot_plugin_orm.__main__ import main
+
+    main(["upgrade"], prog_name="nb orm", standalone_mode=False)
+
+
+def log_startup_report(timings: Dict[str, float], total: float):
+    """输出各插件的加载耗时，从慢到快排列"""
+    lines = [f"启动耗时 {total * 1000:.0f} ms，插件加载耗时："]
+    for name, elapsed in sorted(timings.items(), key=lambda item: item[1], reverse=True):
+        lines.append(f"  {name:<20} {elapsed * 1000:8.1f} ms")
+    logger.info("\n".join(lines))
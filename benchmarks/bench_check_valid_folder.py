@@ -0,0 +1,83 @@
+"""images 插件 check_valid_folder 规则的单条消息耗时
+
+对比旧实现（每条消息遍历 Detail 表逐行 session.get）与内存别名索引 + 快速排除。
+运行：python -m benchmarks.bench_check_valid_folder
+"""
+import asyncio
+import time
+
+from .utils import init_nonebot, load_corpus, make_group_message, report
+
+init_nonebot()
+
+import sys  # noqa: E402
+
+import nonebot  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+from nonebot_plugin_orm import Model  # noqa: E402
+
+images = nonebot.require("images")
+check_valid_folder = images.check_valid_folder
+Detail = images.Detail
+DetailManger = images.DetailManger
+foldername = sys.modules[f"{images.__name__}.foldername"]
+
+ALIASES = [
+    ("相羽爱奈", "相羽爱奈"), ("相羽爱奈", "aiai"), ("伊藤美来", "伊藤美来"),
+    ("伊藤美来", "kdhr"), ("小原好美", "megu"),
+] + [(f"folder{i}", f"alias{i}") for i in range(200)]
+ROUNDS = 200
+
+
+async def legacy_check(session, text: str) -> bool:
+    """旧版规则：每条消息都扫描整张 Detail 表，逐行按主键读取"""
+    for id in (await session.execute(select(Detail.id))).scalars().all():
+        data = await session.get(Detail, id)
+        if text == data.extra_name:
+            return True
+    return False
+
+
+async def main():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Model.metadata.create_all)
+    sessionmaker = async_sessionmaker(engine)
+    async with sessionmaker() as session:
+        for folder_name, extra_name in ALIASES:
+            await DetailManger.create_signmsg(
+                session,
+                folder_name=folder_name,
+                extra_name=extra_name,
+            )
+    for folder_name, extra_name in ALIASES:
+        foldername.add_alias(folder_name, extra_name)
+
+    events = [make_group_message(text) for text in load_corpus()]
+    noise = [e for e in events if not foldername.is_known_alias(e.get_plaintext().strip())]
+
+    async with sessionmaker() as session:
+        start = time.perf_counter_ns()
+        for event in noise[:20]:
+            await legacy_check(session, event.get_plaintext().strip())
+        report("旧实现（全表扫描）", time.perf_counter_ns() - start, len(noise[:20]))
+
+    start = time.perf_counter_ns()
+    for _ in range(ROUNDS):
+        for event in noise:
+            await check_valid_folder(event, {})
+    report("check_valid_folder（普通消息）", time.perf_counter_ns() - start, ROUNDS * len(noise))
+
+    texts = [e.get_plaintext().strip() for e in noise]
+    start = time.perf_counter_ns()
+    for _ in range(ROUNDS):
+        for text in texts:
+            foldername.is_known_alias(text)
+    report("is_known_alias（快速排除）", time.perf_counter_ns() - start, ROUNDS * len(texts))
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+"""消息预分类的单条消息耗时与内存分配
+
+对比各插件规则各自提取纯文本、扫描关键词（旧做法）与预分类一次后查表（新做法）。
+运行：python -m benchmarks.bench_classifier
+"""
+import re
+import time
+import tracemalloc
+
+from .utils import init_nonebot, load_corpus, make_group_message, report
+
+init_nonebot()
+
+import nonebot  # noqa: E402
+
+classifier = nonebot.require("classifier")
+nonebot.require("fight")
+
+ROUNDS = 2000
+
+
+def legacy_rules(event):
+    """旧版：四个规则各自处理一次消息"""
+    text = event.get_plaintext().strip()  # images.check_valid_folder
+    bool(re.match(r"^决斗", event.get_plaintext().strip()))  # fight.check_duel_command
+    event.get_plaintext().strip().lower() in {"接受", "确认", "y", "yes", "ok"}  # fight.check_confirmation
+    msg = event.get_plaintext().strip().lower()  # fight.shoot_checker
+    any(keyword in msg for keyword in ["开枪", "开抢", "bang", "shoot"])
+    return text
+
+
+def classified_rules(event):
+    """新版：预分类一次，规则只做查表"""
+    state = {}
+    result = classifier.classify(event, state)
+    result.text.startswith("决斗")
+    result.lowered in {"接受", "确认", "y", "yes", "ok"}
+    "shoot" in result.categories
+    return result.text
+
+
+def measure(name, func, events):
+    start = time.perf_counter_ns()
+    for _ in range(ROUNDS):
+        for event in events:
+            func(event)
+    report(name, time.perf_counter_ns() - start, ROUNDS * len(events))
+
+    tracemalloc.start()
+    for event in events:
+        func(event)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{'':<32} 峰值分配 {peak / len(events):.0f} 字节/条")
+
+
+def main():
+    events = [make_group_message(text) for text in load_corpus()]
+    measure("各规则分别处理（旧）", legacy_rules, events)
+    measure("预分类 + 查表（新）", classified_rules, events)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""消息回放压测
+
+通过 NoneBot 的事件处理流程驱动真实插件，OneBot 实现由 FakeBot 模拟（可设置 API 延迟），
+回放合成的群消息流量（闲聊、图片查询、存图、决斗），输出吞吐量、各插件处理耗时 p50/p99、
+各阶段的内存峰值，以及（--trace-malloc 时）各插件在阶段结束时仍占用的内存。
+
+运行（在项目根目录）：python -m benchmarks.replay --events 2000 --concurrency 50
+所有数据写入临时目录，不会修改仓库中的 data/。最近一次的结果见 benchmarks/replay_results.txt。
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+REPO_DIR = Path(__file__).parent.parent.resolve()
+WORK_DIR = Path(tempfile.mkdtemp(prefix="aiaibot-replay-"))
+
+# 插件使用相对路径 data/...，切换到临时目录后再加载插件
+shutil.copytree(REPO_DIR / "data" / "images" / "aiai", WORK_DIR / "data" / "images" / "相羽爱奈")
+os.chdir(WORK_DIR)
+sys.path.insert(0, str(REPO_DIR))
+
+from benchmarks.utils import SELF_ID, init_nonebot, load_corpus, make_group_message  # noqa: E402
+
+init_nonebot(
+    sqlalchemy_database_url=f"sqlite+aiosqlite:///{WORK_DIR / 'db.sqlite3'}",
+    state_store_path=str(WORK_DIR / "state.sqlite3"),
+    silence_jobstore_url=f"sqlite:///{WORK_DIR / 'jobs.sqlite3'}",
+    # 工作目录下没有 .env，这里给出与 .env.prod 一致的必要配置
+    alembic_startup_check=False,
+    command_start={"/", ""},
+    # 每条消息的 INFO 日志本身就占了大部分耗时，压测只输出警告
+    log_level="WARNING",
+    # 压测关注插件本身的开销，放开出站限流
+    outbound_global_rate=10 ** 6,
+    outbound_global_burst=10 ** 6,
+    outbound_group_rate=10 ** 6,
+    outbound_group_burst=10 ** 6,
+)
+
+import httpx  # noqa: E402
+import nonebot  # noqa: E402
+from nonebot.adapters.onebot.v11 import Adapter, Bot, Message, MessageSegment  # noqa: E402
+from nonebot.adapters.onebot.v11.event import Reply, Sender  # noqa: E402
+from nonebot.matcher import Matcher  # noqa: E402
+from nonebot.message import handle_event, run_postprocessor, run_preprocessor  # noqa: E402
+from nonebot_plugin_orm import Model, get_session  # noqa: E402
+
+images = nonebot.require("images")
+download = sys.modules[f"{images.__name__}.download"]
+
+PLUGIN_DIR = (REPO_DIR / "aiaibot" / "plugins").resolve()
+
+
+class FakeBot(Bot):
+    """模拟的 OneBot V11 实现，所有 API 调用在固定延迟后返回预设结果"""
+
+    api_latency = 0.0
+
+    def __init__(self, adapter: Adapter, self_id: str):
+        super().__init__(adapter, self_id)
+        self.calls = defaultdict(int)
+        self._message_id = 0
+
+    async def call_api(self, api: str, **data):
+        self.calls[api] += 1
+        if self.api_latency:
+            await asyncio.sleep(self.api_latency)
+        if api in ("send_msg", "send_group_msg", "send_private_msg"):
+            self._message_id += 1
+            return {"message_id": self._message_id}
+        if api == "get_group_member_info":
+            return {"group_id": data["group_id"], "user_id": data["user_id"], "role": "member"}
+        return None
+
+
+def synthetic_image(seed: str) -> bytes:
+    """以 seed 生成 8x8 随机色块的 JPEG，不同 seed 的感知哈希相差很远，不会被当作重复图片"""
+    from PIL import Image
+
+    rng = random.Random(seed)
+    image = Image.new("RGB", (8, 8))
+    image.putdata([(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(64)])
+    buffer = io.BytesIO()
+    image.resize((512, 512), Image.NEAREST).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def mock_image_transport(request: httpx.Request) -> httpx.Response:
+    # 每个 URL 返回像素不同的图片，存图阶段走完整的保存流程而不是被查重拒绝
+    return httpx.Response(200, content=synthetic_image(request.url.path), headers={"content-type": "image/jpeg"})
+
+
+# ---------- 合成流量 ----------
+
+GROUPS = [10000 + i for i in range(20)]
+USERS = [20000 + i for i in range(200)]
+
+
+def chat_events(n: int, corpus: list):
+    for i in range(n):
+        yield make_group_message(random.choice(corpus), random.choice(GROUPS), random.choice(USERS), i)
+
+
+def lookup_events(n: int):
+    for i in range(n):
+        yield make_group_message(random.choice(["aiai", "相羽爱奈"]), random.choice(GROUPS), random.choice(USERS), i)
+
+
+def save_events(n: int):
+    for i in range(n):
+        urls = [f"http://images.invalid/{i}/{j}.jpg" for j in range(random.randint(1, 9))]
+        reply = Reply(
+            time=int(time.time()),
+            message_type="group",
+            message_id=i,
+            real_id=i,
+            sender=Sender(user_id=USERS[0]),
+            message=Message([MessageSegment("image", {"file": url, "url": url}) for url in urls]),
+        )
+        yield make_group_message("存图 aiai", random.choice(GROUPS), USERS[0], i, role="admin", reply=reply)
+
+
+def duel_events(n: int):
+    """每局决斗：发起 -> 接受 -> 立即开枪（提前开枪判负）"""
+    for i in range(n):
+        group_id = GROUPS[i % len(GROUPS)]
+        starter, target = random.sample(USERS, 2)
+        yield [
+            make_group_message(Message("决斗 ") + MessageSegment.at(target), group_id, starter, i * 3),
+            make_group_message("接受", group_id, target, i * 3 + 1),
+            make_group_message("开枪", group_id, starter, i * 3 + 2),
+        ]
+
+
+# ---------- 统计 ----------
+
+_started = {}
+latencies = defaultdict(list)
+
+
+@run_preprocessor
+async def _record_start(matcher: Matcher):
+    _started[id(matcher)] = time.perf_counter()
+
+
+@run_postprocessor
+async def _record_end(matcher: Matcher):
+    start = _started.pop(id(matcher), None)
+    if start is not None:
+        latencies[matcher.plugin_name or "unknown"].append(time.perf_counter() - start)
+
+
+def plugin_memory(snapshot: tracemalloc.Snapshot) -> dict:
+    """按插件汇总快照中仍存活的内存
+
+    每块内存记在调用栈中最靠近分配点的插件代码上，插件调用的库（PIL、SQLAlchemy 等）
+    分配的内存也算在该插件名下；调用栈中没有插件代码的记为 other。
+    """
+    prefix = f"{PLUGIN_DIR}{os.sep}"
+    # 文件名 -> 插件名（不是插件代码时为 None）；快照中有上百万个帧，逐个构造 Path 太慢
+    owners = {}
+    sizes = defaultdict(int)
+    for trace in snapshot.traces:
+        plugin = "other"
+        # Traceback 从最早的帧排到最近的帧
+        for frame in reversed(trace.traceback):
+            filename = frame.filename
+            if filename not in owners:
+                owners[filename] = (
+                    filename[len(prefix):].split(os.sep, 1)[0] if filename.startswith(prefix) else None
+                )
+            if owners[filename]:
+                plugin = owners[filename]
+                break
+        sizes[plugin] += trace.size
+    return sizes
+
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+async def run_phase(name: str, bot: Bot, batches, concurrency: int, trace_malloc: bool):
+    """回放一组事件；batches 的每一项是一个事件或一组需按顺序处理的事件"""
+    latencies.clear()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _play(batch):
+        async with semaphore:
+            for event in batch if isinstance(batch, list) else [batch]:
+                await handle_event(bot, event)
+
+    batches = list(batches)
+    count = sum(len(b) if isinstance(b, list) else 1 for b in batches)
+    if trace_malloc:
+        # 保留足够的调用栈，才能把库内部的分配归到调用它的插件
+        tracemalloc.start(32)
+    start = time.perf_counter()
+    await asyncio.gather(*(_play(batch) for batch in batches))
+    elapsed = time.perf_counter() - start
+    # 等待后台任务（缩略图、出站队列）收尾
+    await asyncio.sleep(0.1)
+    peak = 0
+    retained = {}
+    if trace_malloc:
+        _, peak = tracemalloc.get_traced_memory()
+        retained = plugin_memory(tracemalloc.take_snapshot())
+        tracemalloc.stop()
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    msg = f"\n[{name}] {count} 条消息，耗时 {elapsed:.2f}s，吞吐 {count / elapsed:.0f} 条/s，进程 RSS 峰值 {max_rss:.0f} MiB"
+    if trace_malloc:
+        msg += f"，本阶段 Python 分配峰值 {peak / 1024 / 1024:.1f} MiB"
+    print(msg)
+    for plugin, values in sorted(latencies.items()):
+        print(f"  {plugin:<20} 处理 {len(values):>6} 次  "
+              f"p50 {percentile(values, 0.5) * 1000:8.2f} ms  p99 {percentile(values, 0.99) * 1000:8.2f} ms")
+    if retained:
+        # tracemalloc 只有全局峰值，按插件只能统计阶段结束时仍存活的内存（缓存、索引等）
+        print("  阶段结束时仍存活、本阶段分配的内存：")
+        for plugin, size in sorted(retained.items(), key=lambda item: item[1], reverse=True):
+            print(f"    {plugin:<18} {size / 1024:10.1f} KiB")
+
+
+async def seed_aliases():
+    async with get_session() as session:
+        conn = await session.connection()
+        await conn.run_sync(Model.metadata.create_all)
+        await session.commit()
+        for folder_name, extra_name in [("相羽爱奈", "相羽爱奈"), ("相羽爱奈", "aiai")]:
+            await images.DetailManger.create_signmsg(
+                session,
+                folder_name=folder_name,
+                extra_name=extra_name,
+            )
+    await images.load_alias_index()
+
+
+async def main(args):
+    random.seed(args.seed)
+    FakeBot.api_latency = args.api_latency / 1000
+
+    driver = nonebot.get_driver()
+    await driver._lifespan.startup()
+    await seed_aliases()
+    download._client = httpx.AsyncClient(transport=httpx.MockTransport(mock_image_transport))
+    download._semaphore = asyncio.Semaphore(download.config.images_download_concurrency)
+
+    bot = FakeBot(nonebot.get_adapter(Adapter), str(SELF_ID))
+    driver._bot_connect(bot)
+
+    corpus = load_corpus()
+    n = args.events
+    phases = [
+        ("闲聊", chat_events(n, corpus)),
+        ("图片查询", lookup_events(n // 4)),
+        ("存图", save_events(max(1, n // 100))),
+        ("决斗", duel_events(max(1, n // 20))),
+    ]
+    for name, batches in phases:
+        await run_phase(name, bot, batches, args.concurrency, args.trace_malloc)
+
+    print("\nOneBot API 调用次数：", dict(bot.calls))
+    saved = sum(1 for p in Path("data/images/相羽爱奈").iterdir() if p.is_file())
+    print("存图后文件夹中的图片数：", saved)
+    driver._bot_disconnect(bot)
+    await driver._lifespan.shutdown()
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="aiaibot 消息回放压测")
+    parser.add_argument("--events", type=int, default=2000, help="闲聊阶段的消息数，其余阶段按比例生成")
+    parser.add_argument("--concurrency", type=int, default=50, help="同时处理的消息数")
+    parser.add_argument("--api-latency", type=float, default=5, help="模拟的 OneBot API 延迟（毫秒）")
+    parser.add_argument("--trace-malloc", action="store_true", help="统计每个阶段的 Python 内存分配峰值及各插件仍占用的内存（吞吐会降到几十分之一，建议减少 --events）")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,71 @@
+"""基准测试公用工具，需在项目根目录下以 python -m benchmarks.xxx 运行"""
+import time
+from pathlib import Path
+
+import nonebot
+
+CORPUS_FILE = Path(__file__).parent / "corpus.txt"
+PLUGIN_DIR = Path(__file__).parent.parent / "aiaibot" / "plugins"
+# 模拟的机器人 QQ 号
+SELF_ID = 10001
+
+
+def init_nonebot(**kwargs):
+    """使用无网络驱动初始化 NoneBot，数据库使用内存 SQLite"""
+    kwargs.setdefault("driver", "~none")
+    kwargs.setdefault("sqlalchemy_database_url", "sqlite+aiosqlite://")
+    nonebot.init(**kwargs)
+    from nonebot.adapters.onebot.v11 import Adapter
+    nonebot.get_driver().register_adapter(Adapter)
+    # 与正式运行一致，以同一个插件管理器加载 aiaibot/plugins 下的插件，插件之间可以 require；
+    # 按模块名而不是路径加载，回放压测切换到临时工作目录后也能加载
+    nonebot.load_all_plugins(
+        sorted(f"aiaibot.plugins.{p.name}" for p in PLUGIN_DIR.iterdir() if (p / "__init__.py").exists()),
+        [],
+    )
+
+
+def load_corpus() -> list:
+    """读取消息语料，每行一条群消息"""
+    return [line.rstrip("\n") for line in CORPUS_FILE.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+
+def make_group_message(
+    text,
+    group_id: int = 10000,
+    user_id: int = 20000,
+    message_id: int = 1,
+    role: str = "member",
+    reply=None,
+):
+    """构造一条 OneBot V11 群消息事件，text 可以是字符串或 Message"""
+    from nonebot.adapters.onebot.v11 import GroupMessageEvent, Message
+    from nonebot.adapters.onebot.v11.event import Sender
+
+    message = Message(text)
+    return GroupMessageEvent(
+        time=int(time.time()),
+        self_id=SELF_ID,
+        post_type="message",
+        sub_type="normal",
+        user_id=user_id,
+        message_type="group",
+        message_id=message_id,
+        message=message,
+        original_message=message,
+        raw_message=str(message),
+        font=0,
+        sender=Sender(user_id=user_id, nickname="bench", role=role),
+        group_id=group_id,
+        to_me=False,
+        reply=reply,
+    )
+
+
+def report(name: str, total_ns: int, count: int):
+    """输出每条消息的平均耗时"""
+    per = total_ns / count if count else 0
+    if per >= 1000:
+        print(f"{name:<32} {count:>8} 次  平均 {per / 1000:8.2f} µs/条")
+    else:
+        print(f"{name:<32} {count:>8} 次  平均 {per:8.1f} ns/条")
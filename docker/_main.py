@@ -1,4 +1,15 @@
-import nonebot
-import bot  # noqa: F401
+import time
+
+_start = time.perf_counter()
+
+import nonebot  # noqa: E402
+
+# 只在这里初始化一次，不再导入 nb-cli 生成的 bot.py
+nonebot.init()
+
+from aiaibot.startup import load_from_toml_timed, log_startup_report  # noqa: E402
+
+# 适配器、内置插件与插件目录都以 pyproject.toml 的 [tool.nonebot] 为准
+log_startup_report(load_from_toml_timed("pyproject.toml"), time.perf_counter() - _start)
 
 app = nonebot.get_asgi()
@@ -0,0 +1,3 @@
+#! /usr/bin/env sh
+# 由 /start.sh 在启动 gunicorn 前执行：先把数据库升级到最新迁移
+python -m scripts.upgrade_db
@@ -0,0 +1,64 @@
+"""批量导入/导出别名
+
+在项目根目录运行：
+    python -m scripts.aliases import 文件 [--format csv|json]
+    python -m scripts.aliases export [文件] [--format csv|json]
+导入在一个事务中完成，已存在的别名会被跳过；bot 运行中导入时，重启或执行一次“导入别名”后生效。
+数据库与 bot 相同：由 nonebot_plugin_orm 按 .env 解析（未配置 SQLALCHEMY_DATABASE_URL 时使用其默认的
+SQLite 文件）。运行前先升级到最新迁移，不会按模型同步表结构。
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+import nonebot
+
+nonebot.init(driver="~none")
+
+from aiaibot.startup import load_plugins_timed, upgrade_database  # noqa: E402
+
+# 插件之间通过 require 互相引用，需按插件名加载后再导入
+load_plugins_timed()
+
+from nonebot_plugin_orm import get_session  # noqa: E402
+
+from aiaibot.plugins.images.aliasio import dump_aliases, parse_aliases  # noqa: E402
+from aiaibot.plugins.images.models_method import DetailManger  # noqa: E402
+
+
+async def main(args):
+    async with get_session() as session:
+        if args.command == "import":
+            try:
+                pairs, invalid = parse_aliases(Path(args.file).read_text(encoding="utf-8"), args.format)
+            except ValueError as e:
+                sys.exit(f"格式错误：{str(e)}")
+            for raw in invalid:
+                print(f"无效行：{raw}", file=sys.stderr)
+            known = {folder_name for folder_name, _ in await DetailManger.get_all_alias_pairs(session)}
+            inserted = await DetailManger.bulk_create_aliases(session, pairs)
+            await session.commit()
+            print(f"导入 {inserted} 个别名，{len(pairs) - inserted} 个已存在，{len(invalid)} 行无效")
+            unknown = [name for name in dict.fromkeys(folder for folder, _ in pairs) if name not in known]
+            if unknown:
+                print(f"以下文件夹此前不存在，请确认没有写错：{'、'.join(unknown)}", file=sys.stderr)
+        else:
+            text = dump_aliases(await DetailManger.get_all_alias_pairs(session), args.format or "csv")
+            if args.file:
+                Path(args.file).write_text(text, encoding="utf-8")
+            else:
+                sys.stdout.write(text)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("file", nargs="?", help="导入时必填；导出时不填则输出到标准输出")
+    parser.add_argument("--format", choices=["csv", "json"], help="导入时不填则按内容判断，导出默认 csv")
+    args = parser.parse_args()
+    if args.command == "import" and not args.file:
+        parser.error("import 需要指定文件")
+    # 不走 init_orm：关闭启动检查时它会按模型同步表结构，可能重建 Detail 表
+    upgrade_database()
+    asyncio.run(main(args))
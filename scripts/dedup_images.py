@@ -0,0 +1,41 @@
+"""离线去重已有图片库
+
+在项目根目录运行：python -m scripts.dedup_images [文件夹名 ...]
+不指定文件夹时处理 data/images 下的所有文件夹。
+"""
+import asyncio
+import sys
+
+import nonebot
+
+nonebot.init(driver="~none")
+
+from aiaibot.startup import load_plugins_timed  # noqa: E402
+
+# images 插件 require 了 outbound 等插件，需先加载整个插件目录再导入
+load_plugins_timed()
+
+from aiaibot.plugins.images import BASE_IMAGE_DIR  # noqa: E402
+from aiaibot.plugins.images.blobs import collect_garbage  # noqa: E402
+from aiaibot.plugins.images.phash import dedup_folder  # noqa: E402
+
+
+def main(folder_names):
+    if folder_names:
+        target_dirs = [BASE_IMAGE_DIR / name for name in folder_names]
+    else:
+        target_dirs = sorted(p for p in BASE_IMAGE_DIR.iterdir() if p.is_dir())
+    total = 0
+    for target_dir in target_dirs:
+        removed = asyncio.run(dedup_folder(target_dir))
+        total += len(removed)
+        for name in removed:
+            print(f"删除 {target_dir.name}/{name}")
+    print(f"共删除 {total} 张重复图片")
+    # 与“去重”指令相同，删除不再被任何文件夹引用的 blob
+    freed = collect_garbage()
+    print(f"清理未引用的 blob，释放 {freed / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
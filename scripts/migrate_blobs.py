@@ -0,0 +1,67 @@
+"""把已有的图片库迁移到按内容寻址的 blob 库
+
+在项目根目录运行：python -m scripts.migrate_blobs [--dry-run] [--gc]
+data/images 下的每张图片按 sha256 放入 data/blobs，文件夹中的文件替换为指向 blob 的硬链接，
+相同内容的图片（包括不同文件夹中的）只保留一份数据。文件名不变，可重复运行。
+--gc 同时删除没有被任何文件夹引用的 blob。
+"""
+import argparse
+import os
+
+import nonebot
+
+nonebot.init(driver="~none")
+
+from aiaibot.startup import load_plugins_timed  # noqa: E402
+
+# images 插件 require 了 outbound 等插件，需先加载整个插件目录再导入
+load_plugins_timed()
+
+from aiaibot.plugins.images import BASE_IMAGE_DIR  # noqa: E402
+from aiaibot.plugins.images.blobs import blob_path, collect_garbage, file_digest, link_file  # noqa: E402
+from aiaibot.plugins.images.catalog import VALID_EXTS  # noqa: E402
+
+
+def migrate_file(path, dry_run: bool) -> int:
+    """迁移单个文件，返回节省的字节数"""
+    digest = file_digest(path)
+    blob = blob_path(digest)
+    stat = path.stat()
+    if not blob.exists():
+        if not dry_run:
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            link_file(path, blob)
+        return 0
+    blob_stat = blob.stat()
+    if blob_stat.st_ino == stat.st_ino and blob_stat.st_dev == stat.st_dev:
+        return 0
+    if not dry_run:
+        link_file(blob, path)
+    # 该文件不再单独占用空间（仍有其他硬链接时不计）
+    return stat.st_size if stat.st_nlink <= 1 else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="只统计，不修改文件")
+    parser.add_argument("--gc", action="store_true", help="删除没有被引用的 blob")
+    args = parser.parse_args()
+
+    files = saved = 0
+    for folder_dir in sorted(p for p in BASE_IMAGE_DIR.iterdir() if p.is_dir()):
+        for entry in sorted(os.scandir(folder_dir), key=lambda e: e.name):
+            if entry.name.startswith(".") or not entry.is_file():
+                continue
+            if os.path.splitext(entry.name)[1].lower() not in VALID_EXTS:
+                continue
+            saved += migrate_file(folder_dir / entry.name, args.dry_run)
+            files += 1
+    print(f"处理 {files} 张图片，{'可' if args.dry_run else '已'}节省 {saved / 1024 / 1024:.1f} MiB")
+
+    if args.gc and not args.dry_run:
+        freed = collect_garbage()
+        print(f"清理未引用的 blob，释放 {freed / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
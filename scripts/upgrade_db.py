@@ -0,0 +1,17 @@
+"""把数据库升级到最新迁移，不需要确认
+
+在项目根目录运行：python -m scripts.upgrade_db
+容器启动前由 prestart.sh 执行；之后 bot 以 ALEMBIC_STARTUP_CHECK=true 启动，只检查迁移，不再同步表结构。
+"""
+import nonebot
+
+nonebot.init(driver="~none")
+
+from aiaibot.startup import load_plugins_timed, upgrade_database  # noqa: E402
+
+# 各插件的迁移目录随插件注册，需先加载整个插件目录
+load_plugins_timed()
+
+
+if __name__ == "__main__":
+    upgrade_database()
@@ -0,0 +1,18 @@
+from pathlib import Path
+
+import nonebot
+import pytest
+
+PLUGIN_DIR = Path(__file__).parent.parent / "aiaibot" / "plugins"
+
+
+def pytest_configure(config: pytest.Config):
+    nonebot.init(
+        driver="~none",
+        sqlalchemy_database_url="sqlite+aiosqlite://",
+        alembic_startup_check=False,
+        silence_jobstore_url="sqlite://",
+    )
+    from nonebot.adapters.onebot.v11 import Adapter
+    nonebot.get_driver().register_adapter(Adapter)
+    nonebot.load_plugins(str(PLUGIN_DIR))
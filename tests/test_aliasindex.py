@@ -0,0 +1,51 @@
+import sys
+
+import nonebot
+
+
+def _aliasindex():
+    images = nonebot.require("images")
+    return sys.modules[f"{images.__name__}.aliasindex"]
+
+
+def test_pinyin_key_does_not_shadow_normalized_alias(monkeypatch):
+    aliasindex = _aliasindex()
+    monkeypatch.setattr(aliasindex, "pinyin_key", lambda text: "aiai" if text == "爱爱" else None)
+
+    index = aliasindex.AliasIndex({"爱爱": "爱爱的文件夹", "aiai": "相羽爱奈"}, pinyin=True)
+
+    assert index.lookup("AIAI") == "相羽爱奈"
+    index.remove("aiai")
+    # 规范形式被删除后，拼音键接替
+    assert index.lookup("aiai") == "爱爱的文件夹"
+
+
+def test_incremental_updates_match_rebuild():
+    aliasindex = _aliasindex()
+    aliases = {"相羽爱奈": "相羽爱奈", "aiai": "相羽爱奈", "AIAI": "别的文件夹", "kdhr": "伊藤美来"}
+    index = aliasindex.AliasIndex({})
+    for extra_name, folder_name in aliases.items():
+        index.add(extra_name, folder_name)
+    index.add("临时", "伊藤美来")
+    index.remove("临时")
+    index.remove("aiai")
+    del aliases["aiai"]
+
+    rebuilt = aliasindex.AliasIndex(aliases)
+    assert index.folders == rebuilt.folders
+    assert index.sorted_keys == rebuilt.sorted_keys
+    assert {g: sorted(k) for g, k in index.grams.items()} == {g: sorted(k) for g, k in rebuilt.grams.items()}
+    assert index.lookup("aiai") == "别的文件夹"
+    assert index.lookup("临时") is None
+
+
+def test_fast_exclusion_keeps_normalized_matches():
+    aliasindex = _aliasindex()
+    index = aliasindex.AliasIndex({"相羽爱奈": "相羽爱奈", "aiai": "相羽爱奈"})
+
+    assert index.excludes("今天吃什么")
+    assert index.excludes("爱奈今天吃什么" * 3)
+    assert not index.excludes("相羽 爱奈")
+    assert index.lookup("相羽 爱奈") == "相羽爱奈"
+    assert index.lookup("ＡＩＡＩ") == "相羽爱奈"
+
@@ -0,0 +1,51 @@
+import sys
+
+import nonebot
+import pytest
+
+
+def _aliasio():
+    images = nonebot.require("images")
+    return sys.modules[f"{images.__name__}.aliasio"]
+
+
+def test_valid_rows_parsed():
+    aliasio = _aliasio()
+    text = '{"相羽爱奈": ["aiai", "爱奈"], "伊藤美来": "mikku"}'
+    assert aliasio.parse_aliases(text) == (
+        [("相羽爱奈", "aiai"), ("相羽爱奈", "爱奈"), ("伊藤美来", "mikku")], []
+    )
+    text = '[["相羽爱奈", "aiai"], {"folder_name": "伊藤美来", "extra_name": "mikku"}]'
+    assert aliasio.parse_aliases(text) == ([("相羽爱奈", "aiai"), ("伊藤美来", "mikku")], [])
+    assert aliasio.parse_aliases("folder_name,extra_name\n相羽爱奈,aiai\n") == ([("相羽爱奈", "aiai")], [])
+
+
+@pytest.mark.parametrize("text", [
+    # 两个字符的字符串不是 (文件夹, 别名)
+    '["ab"]',
+    '[["相羽爱奈"]]',
+    '[["相羽爱奈", "aiai", "多余"]]',
+    '[["相羽爱奈", 1]]',
+    '{"相羽爱奈": null}',
+    '{"相羽爱奈": [1, ""]}',
+    '[{"folder_name": "相羽爱奈"}]',
+    '[{"folder_name": "相羽爱奈", "extra_name": null}]',
+    '[null, 5]',
+    "相羽爱奈\n",
+])
+def test_malformed_rows_reported(text):
+    pairs, invalid = _aliasio().parse_aliases(text)
+    assert pairs == []
+    assert invalid
+
+
+def test_bad_rows_reported_alongside_valid_ones():
+    pairs, invalid = _aliasio().parse_aliases('[["相羽爱奈", "aiai"], "ab", {"folder_name": "a/b", "extra_name": "x"}]')
+    assert pairs == [("相羽爱奈", "aiai")]
+    assert invalid == ['"ab"', '{"folder_name": "a/b", "extra_name": "x"}']
+
+
+@pytest.mark.parametrize("text", ['"ab"', "5", "[", "{"])
+def test_unparsable_json_raises_value_error(text):
+    with pytest.raises(ValueError):
+        _aliasio().parse_aliases(text, "json")
@@ -0,0 +1,28 @@
+import errno
+import os
+import sys
+
+import nonebot
+import pytest
+
+
+def _blobs():
+    images = nonebot.require("images")
+    return sys.modules[f"{images.__name__}.blobs"]
+
+
+def test_link_file_fails_without_hardlinks(tmp_path, monkeypatch):
+    blobs = _blobs()
+    src = tmp_path / "blob"
+    src.write_bytes(b"image")
+    dst = tmp_path / "1.png"
+
+    def no_link(src, dst):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(os, "link", no_link)
+    # 复制出的文件会被 collect_garbage 误删 blob，不能退化为复制
+    with pytest.raises(OSError) as exc_info:
+        blobs.link_file(src, dst)
+    assert exc_info.value.errno == errno.EXDEV
+    assert not dst.exists()
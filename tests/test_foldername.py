@@ -0,0 +1,66 @@
+import asyncio
+import sys
+
+import nonebot
+
+
+def _images():
+    images = nonebot.require("images")
+    return (
+        sys.modules[f"{images.__name__}.foldername"],
+        sys.modules[f"{images.__name__}.models_method"].DetailManger,
+    )
+
+
+async def _create_tables():
+    from nonebot_plugin_orm import Model, get_session
+
+    async with get_session() as session:
+        conn = await session.connection()
+        await conn.run_sync(Model.metadata.create_all)
+        await session.commit()
+
+
+def test_removing_shadowing_alias_restores_other_folder(monkeypatch):
+    from nonebot_plugin_orm import get_session
+
+    foldername, DetailManger = _images()
+    monkeypatch.setattr(foldername, "alias_index", {})
+
+    async def main():
+        await _create_tables()
+        async with get_session() as session:
+            await DetailManger.create_signmsg(session, folder_name="相羽爱奈", extra_name="共用别名")
+            await DetailManger.create_signmsg(session, folder_name="伊藤美来", extra_name="共用别名")
+        await foldername.load_alias_index()
+        before = await foldername.get_folder_name("共用别名")
+
+        async with get_session() as session:
+            await DetailManger.delete_alias(session, "相羽爱奈", "共用别名")
+        await foldername.remove_alias("相羽爱奈", "共用别名")
+        after = await foldername.get_folder_name("共用别名")
+
+        async with get_session() as session:
+            await DetailManger.delete_alias(session, "伊藤美来", "共用别名")
+        await foldername.remove_alias("伊藤美来", "共用别名")
+        return before, after, await foldername.get_folder_name("共用别名")
+
+    assert asyncio.run(main()) == ("相羽爱奈", "伊藤美来", None)
+
+
+def test_import_reports_failed_reload_and_unknown_folders(monkeypatch):
+    foldername, DetailManger = _images()
+    monkeypatch.setattr(foldername, "alias_index", {"aiai": "相羽爱奈"})
+
+    async def broken_reload(session):
+        raise RuntimeError("database is locked")
+
+    async def main():
+        await _create_tables()
+        unknown = foldername.unknown_folders(["相羽爱奈", "相羽愛奈", "相羽愛奈"])
+        monkeypatch.setattr(DetailManger, "get_all_alias_pairs", broken_reload)
+        return unknown, await foldername.import_aliases([("相羽愛奈", "aiai2")])
+
+    assert asyncio.run(main()) == (["相羽愛奈"], (1, False))
+    # 重新加载失败时保留原有索引
+    assert foldername.alias_index == {"aiai": "相羽爱奈"}
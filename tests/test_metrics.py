@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+import nonebot
+from nonebot.adapters.onebot.v11 import Bot, Message, PrivateMessageEvent
+from nonebot.adapters.onebot.v11.event import Sender
+from nonebot.exception import IgnoredException
+from nonebot.matcher import Matcher
+from nonebot.message import handle_event, run_preprocessor
+
+
+def _private_message(text: str) -> PrivateMessageEvent:
+    message = Message(text)
+    return PrivateMessageEvent(
+        time=int(time.time()),
+        self_id=10000,
+        post_type="message",
+        sub_type="friend",
+        user_id=30000,
+        message_type="private",
+        message_id=1,
+        message=message,
+        original_message=message,
+        raw_message=text,
+        font=0,
+        sender=Sender(user_id=30000),
+        to_me=True,
+    )
+
+
+def test_handler_timing_entry_removed_when_run_ignored():
+    metrics = nonebot.require("metrics")
+    matcher_type = nonebot.on_fullmatch("metrics-ignored-handler", temp=True, block=True)
+
+    @run_preprocessor
+    async def _ignore(matcher: Matcher):
+        # 与 metrics 的预处理器并发执行，忽略后不会运行后处理器
+        if type(matcher) is matcher_type:
+            raise IgnoredException("ignored in test")
+
+    bot = Bot(nonebot.get_adapter("OneBot V11"), "10000")
+    asyncio.run(handle_event(bot, _private_message("metrics-ignored-handler")))
+
+    assert metrics._handler_started == {}
+
+
+def test_metrics_token_and_loopback(monkeypatch):
+    metrics = nonebot.require("metrics")
+
+    assert metrics._authorized("", "127.0.0.1")
+    assert not metrics._authorized("", "172.17.0.1")
+
+    monkeypatch.setattr(metrics.config, "metrics_token", "s3cret")
+    assert metrics._authorized("Bearer s3cret", "172.17.0.1")
+    assert not metrics._authorized("Bearer wrong", "127.0.0.1")
@@ -0,0 +1,61 @@
+import hashlib
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+PAIRS = [("相羽爱奈", "aiai"), ("相羽爱奈", "爱奈"), ("伊藤美来", "mikku")]
+
+
+def _run_script(module, db_path, *args):
+    # NoneBot 只从 .env 文件读取插件配置项：先以指向临时数据库的配置初始化，脚本里的 nonebot.init 不再生效
+    code = (
+        "import sys, runpy, nonebot\n"
+        f"nonebot.init(driver='~none', sqlalchemy_database_url='sqlite+aiosqlite:///{db_path}',"
+        " silence_jobstore_url='sqlite://')\n"
+        f"sys.argv = [{module!r}, *{list(args)!r}]\n"
+        f"runpy.run_module({module!r}, run_name='__main__')\n"
+    )
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT, env=dict(os.environ, ENVIRONMENT="test"),
+        capture_output=True, text=True, timeout=120, check=True,
+    )
+
+
+def test_upgrade_keeps_aliases_from_baseline_table(tmp_path):
+    # 旧部署以 ALEMBIC_STARTUP_CHECK=false 同步出的表：md5 字符串主键、可空列，没有 alembic_version
+    db_path = tmp_path / "db.sqlite3"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            'CREATE TABLE "Detail" (id VARCHAR(255) NOT NULL, folder_name VARCHAR(255), '
+            'extra_name VARCHAR(255), CONSTRAINT "pk_Detail" PRIMARY KEY (id))'
+        )
+        conn.executemany(
+            'INSERT INTO "Detail" VALUES (?, ?, ?)',
+            [(hashlib.md5(extra.encode()).hexdigest(), folder, extra) for folder, extra in PAIRS],
+        )
+
+    _run_script("scripts.upgrade_db", db_path)
+
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute('SELECT folder_name, extra_name FROM "Detail" ORDER BY id').fetchall()
+        id_type = next(row[2] for row in conn.execute('PRAGMA table_info("Detail")') if row[1] == "id")
+        versions = conn.execute("SELECT version_num FROM alembic_version").fetchall()
+    assert rows == PAIRS
+    assert id_type.upper() == "INTEGER"
+    assert versions
+
+    # 别名脚本同样先升级（此时已是最新），不会重建表
+    exported = _run_script("scripts.aliases", db_path, "export").stdout
+    assert all(extra in exported for _, extra in PAIRS)
+
+
+def test_shipped_configs_keep_startup_check():
+    # 关闭启动检查时 ORM 按模型同步表结构，会重建 Detail 并丢掉所有别名
+    for name in (".env.prod", ".env.dev"):
+        assert "ALEMBIC_STARTUP_CHECK=true" in (ROOT / name).read_text().splitlines()
+    assert "ALEMBIC_STARTUP_CHECK: true" in (ROOT / "docker-compose.yml").read_text()
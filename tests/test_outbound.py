@@ -0,0 +1,101 @@
+import asyncio
+
+import nonebot
+import pytest
+from nonebot.exception import NetworkError
+
+
+class FakeBot:
+    self_id = "10000"
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = []
+
+    async def call_api(self, api, **data):
+        self.calls.append(api)
+        await asyncio.sleep(0)
+        if len(self.calls) <= self.failures:
+            raise NetworkError("timeout")
+        return {"message_id": len(self.calls)}
+
+
+@pytest.fixture
+def outbound(monkeypatch):
+    outbound = nonebot.require("outbound")
+    # 每个测试使用新的事件循环，队列状态不能跨测试保留
+    monkeypatch.setattr(outbound, "_queue", [])
+    monkeypatch.setattr(outbound, "_inflight", {})
+    monkeypatch.setattr(outbound, "_group_buckets", {})
+    monkeypatch.setattr(outbound, "_wakeup", None)
+    monkeypatch.setattr(outbound, "_dispatcher", None)
+    monkeypatch.setattr(outbound, "_executing", set())
+    monkeypatch.setattr(outbound.config, "outbound_retry_delay", 0)
+    return outbound
+
+
+def test_send_not_retried_after_network_error(outbound):
+    bot = FakeBot(failures=1)
+
+    async def main():
+        with pytest.raises(NetworkError):
+            await outbound.call(bot, "send_group_msg", group_id=1, message="hi")
+
+    asyncio.run(main())
+    assert bot.calls == ["send_group_msg"]
+
+
+def test_ban_retried_after_network_error(outbound):
+    bot = FakeBot(failures=1)
+
+    async def main():
+        return await outbound.call(
+            bot, "set_group_ban", coalesce=True, group_id=1, user_id=2, duration=60
+        )
+
+    assert asyncio.run(main()) == {"message_id": 2}
+    assert bot.calls == ["set_group_ban", "set_group_ban"]
+
+
+def test_identical_sends_not_coalesced(outbound):
+    bot = FakeBot(failures=0)
+
+    async def main():
+        return await asyncio.gather(
+            outbound.call(bot, "send_group_msg", group_id=1, message="hi"),
+            outbound.call(bot, "send_group_msg", group_id=1, message="hi"),
+        )
+
+    asyncio.run(main())
+    assert bot.calls == ["send_group_msg", "send_group_msg"]
+
+
+def test_coalescing_requires_idempotent_api(outbound):
+    bot = FakeBot(failures=0)
+
+    async def main():
+        await outbound.call(bot, "send_group_msg", coalesce=True, group_id=1, message="hi")
+
+    with pytest.raises(ValueError):
+        asyncio.run(main())
+
+
+def test_shutdown_cancels_executing_calls(outbound):
+    started = asyncio.Event()
+
+    class SlowBot(FakeBot):
+        async def call_api(self, api, **data):
+            started.set()
+            await asyncio.sleep(60)
+
+    async def main():
+        caller = asyncio.ensure_future(outbound.call(SlowBot(failures=0), "get_msg", message_id=1))
+        await started.wait()
+        assert len(outbound._executing) == 1
+        await outbound._stop_dispatcher()
+        assert not outbound._executing
+        assert outbound._dispatcher.done()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+
+    asyncio.run(main())
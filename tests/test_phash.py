@@ -0,0 +1,133 @@
+import asyncio
+import json
+import random
+import sys
+
+import nonebot
+from PIL import Image, ImageDraw
+
+
+def _phash():
+    images = nonebot.require("images")
+    return sys.modules[f"{images.__name__}.phash"]
+
+
+def _save_pattern(path, mark: int = 0):
+    """条纹加圆形的图案，mark 为右下角小方块的边长，用于制造相近但不相同的图片"""
+    image = Image.new("RGB", (256, 256), "white")
+    draw = ImageDraw.Draw(image)
+    for i in range(0, 256, 32):
+        draw.rectangle((i, 0, i + 15, 255), fill=(i, 80, 160))
+    draw.ellipse((60, 60, 190, 190), fill="black")
+    if mark:
+        draw.rectangle((200, 200, 200 + mark, 200 + mark), fill="red")
+    image.save(path)
+
+
+def test_near_duplicate_detected_when_index_not_loaded(tmp_path, monkeypatch):
+    phash = _phash()
+    monkeypatch.setattr(phash, "PHASH_DIR", tmp_path / "phash")
+    monkeypatch.setattr(phash, "_indexes", {})
+    folder = tmp_path / "aiai"
+    folder.mkdir()
+    _save_pattern(folder / "1_original.png")
+    # 刚下载的近似图片已在文件夹中，而该文件夹的索引尚未加载
+    saved = folder / "2_saved.png"
+    _save_pattern(saved, mark=2)
+    distance = phash._distance(phash.compute_hash(saved), phash.compute_hash(folder / "1_original.png"))
+    assert 0 < distance <= phash.config.images_dedup_distance
+
+    duplicate = asyncio.run(phash.register_image(folder, saved))
+
+    assert duplicate == "aiai/1_original.png"
+
+
+def test_unique_image_registered_on_first_save(tmp_path, monkeypatch):
+    phash = _phash()
+    monkeypatch.setattr(phash, "PHASH_DIR", tmp_path / "phash")
+    monkeypatch.setattr(phash, "_indexes", {})
+    folder = tmp_path / "new"
+    folder.mkdir()
+    saved = folder / "1_saved.png"
+    _save_pattern(saved)
+
+    assert asyncio.run(phash.register_image(folder, saved)) is None
+    assert "1_saved.png" in phash._indexes[folder].hashes
+
+
+def test_concurrent_registrations_all_persisted(tmp_path, monkeypatch):
+    phash = _phash()
+    monkeypatch.setattr(phash, "PHASH_DIR", tmp_path / "phash")
+    monkeypatch.setattr(phash, "_indexes", {})
+    folder = tmp_path / "many"
+    folder.mkdir()
+    paths = []
+    for i in range(8):
+        rng = random.Random(i)
+        image = Image.new("RGB", (8, 8))
+        image.putdata([(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(64)])
+        path = folder / f"{i}.png"
+        image.resize((128, 128), Image.NEAREST).save(path)
+        paths.append(path)
+
+    async def main():
+        return await asyncio.gather(*(phash.register_image(folder, path) for path in paths))
+
+    assert asyncio.run(main()) == [None] * len(paths)
+    saved = json.loads((tmp_path / "phash" / "many.json").read_text(encoding="utf-8"))
+    assert sorted(saved) == sorted(path.name for path in paths)
+    assert not list((tmp_path / "phash").glob("*.tmp"))
+
+
+def test_concurrent_first_use_loads_index_once(tmp_path, monkeypatch):
+    phash = _phash()
+    monkeypatch.setattr(phash, "PHASH_DIR", tmp_path / "phash")
+    monkeypatch.setattr(phash, "_indexes", {})
+    monkeypatch.setattr(phash, "_pending", {})
+    folder = tmp_path / "aiai"
+    folder.mkdir()
+    _save_pattern(folder / "1_original.png")
+    loads = []
+    load = phash.PHashIndex.load
+
+    def counting_load(self):
+        loads.append(self.folder_dir)
+        load(self)
+
+    monkeypatch.setattr(phash.PHashIndex, "load", counting_load)
+
+    async def main():
+        return await asyncio.gather(*(phash.get_index(folder) for _ in range(4)))
+
+    indexes = asyncio.run(main())
+    assert loads == [folder]
+    assert all(index is indexes[0] for index in indexes)
+
+
+def test_dedup_drops_stale_index_writes(tmp_path, monkeypatch):
+    phash = _phash()
+    monkeypatch.setattr(phash, "PHASH_DIR", tmp_path / "phash")
+    monkeypatch.setattr(phash, "_indexes", {})
+    monkeypatch.setattr(phash, "_pending", {})
+    monkeypatch.setattr(phash, "_generations", {})
+    folder = tmp_path / "aiai"
+    folder.mkdir()
+    _save_pattern(folder / "1_original.png")
+    _save_pattern(folder / "2_near.png", mark=2)
+
+    async def main():
+        old = await phash.get_index(folder)
+        dedup = asyncio.ensure_future(phash.dedup_folder(folder))
+        await asyncio.sleep(0)
+        # 去重开始后，持有旧索引的登记不能把旧内容写回
+        old.add("stale.png", 0)
+        await old.save_async()
+        new = await phash.get_index(folder)
+        return old, new, await dedup
+
+    old, new, removed = asyncio.run(main())
+    assert removed == ["2_near.png"]
+    assert new is not old and phash._indexes[folder] is new
+    saved = json.loads((tmp_path / "phash" / "aiai.json").read_text(encoding="utf-8"))
+    assert sorted(saved) == ["1_original.png"]
+    assert not list((tmp_path / "phash").glob("*.tmp"))
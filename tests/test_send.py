@@ -0,0 +1,51 @@
+import asyncio
+import sys
+
+import nonebot
+from PIL import Image
+
+
+def _send():
+    images = nonebot.require("images")
+    return sys.modules[f"{images.__name__}.send"]
+
+
+def test_url_mode_falls_back_to_bytes_when_mount_fails(tmp_path, monkeypatch):
+    send = _send()
+    monkeypatch.setattr(send, "_send_mode", "url")
+    monkeypatch.setattr(send, "_routes", {})
+    monkeypatch.setattr(send.config, "images_base_url", "http://127.0.0.1:12045")
+    monkeypatch.setattr(send.config, "images_payload_cache_bytes", 0)
+    path = tmp_path / "images" / "1.png"
+    path.parent.mkdir()
+    Image.new("RGB", (4, 4), "red").save(path)
+
+    # 测试使用的 ~none 驱动没有 ASGI 应用，挂载必然失败
+    send.mount_image_route(path.parent, "/images")
+
+    assert send.send_mode() == "bytes"
+    segment = asyncio.run(send.build_image_segment(path))
+    assert str(segment.data["file"]).startswith("base64://")
+
+
+def test_send_ref_lookup_only_in_file_mode(monkeypatch):
+    images = nonebot.require("images")
+    sendref = sys.modules[f"{images.__name__}.sendref"]
+    recorded = []
+
+    async def record(bot, path, send_result):
+        recorded.append(path)
+
+    monkeypatch.setattr(sendref, "record", record)
+
+    async def main():
+        # bytes/url 模式不查询引用，不多发 get_msg
+        sendref.schedule_record(None, "bytes.png", {"message_id": 1}, "bytes")
+        sendref.schedule_record(None, "url.png", {"message_id": 2}, "url")
+        sendref.schedule_record(None, "file.png", {"message_id": 3}, "file")
+        assert len(sendref._tasks) == 1
+        await asyncio.gather(*sendref._tasks)
+
+    asyncio.run(main())
+    assert recorded == ["file.png"]
+    assert not sendref._tasks
@@ -0,0 +1,50 @@
+import asyncio
+import sqlite3
+import sys
+import time
+
+import nonebot
+
+
+def _store():
+    state_store = nonebot.require("state_store")
+    return sys.modules[f"{state_store.__name__}.store"]
+
+
+def test_expired_keys_purged_on_write(tmp_path, monkeypatch):
+    store = _store()
+    path = tmp_path / "state.sqlite3"
+    duel = store.SQLiteStateStore("duel", str(path))
+    roulette = store.SQLiteStateStore("roulette", str(path))
+    # 刚清理过，间隔内的写入不再清理
+    monkeypatch.setattr(store.SQLiteStateStore, "_purged_at", {duel.path: time.time()})
+
+    def keys():
+        with sqlite3.connect(path) as conn:
+            return sorted(row[0] for row in conn.execute("SELECT key FROM plugin_state"))
+
+    asyncio.run(duel.set("expired", 1, ttl=-1))
+    asyncio.run(duel.set("kept", 2))
+    assert asyncio.run(duel.get("expired")) is None
+    assert keys() == ["expired", "kept"]
+
+    monkeypatch.setattr(store.SQLiteStateStore, "_purged_at", {})
+    # 任意命名空间的写入都会清理整个数据库的过期键
+    asyncio.run(roulette.set("other", 3))
+    assert keys() == ["kept", "other"]
+
+
+def test_get_does_not_wait_for_other_writers(tmp_path):
+    store = _store()
+    path = tmp_path / "state.sqlite3"
+    state = store.SQLiteStateStore("duel", str(path))
+    asyncio.run(state.set("game", {"round": 1}))
+
+    # 另一个进程持有写锁时，读取不需要等待
+    writer = sqlite3.connect(path, isolation_level=None, timeout=0)
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        assert asyncio.run(state.get("game")) == {"round": 1}
+    finally:
+        writer.execute("ROLLBACK")
+        writer.close()
@@ -0,0 +1,43 @@
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import nonebot
+from PIL import Image
+
+
+def _thumbnail():
+    images = nonebot.require("images")
+    return sys.modules[f"{images.__name__}.thumbnail"]
+
+
+def test_animated_image_transcoded_once(tmp_path, monkeypatch):
+    thumbnail = _thumbnail()
+    monkeypatch.setattr(thumbnail, "THUMB_DIR", tmp_path / "thumbs")
+    monkeypatch.setattr(thumbnail, "_skipped", {})
+    monkeypatch.setattr(thumbnail.config, "images_thumbnail", True)
+    monkeypatch.setattr(thumbnail.config, "images_thumbnail_min_size", 0)
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(thumbnail, "_get_executor", lambda: executor)
+    calls = []
+    transcode = thumbnail._transcode
+
+    def counting_transcode(*args):
+        calls.append(args[0])
+        return transcode(*args)
+
+    monkeypatch.setattr(thumbnail, "_transcode", counting_transcode)
+
+    path = tmp_path / "aiai" / "1.png"
+    path.parent.mkdir()
+    frames = [Image.new("RGB", (64, 64), color) for color in ("red", "blue")]
+    frames[0].save(path, save_all=True, append_images=frames[1:])
+
+    async def main():
+        return [await thumbnail.get_variant(path) for _ in range(3)]
+
+    try:
+        assert asyncio.run(main()) == [path] * 3
+    finally:
+        executor.shutdown()
+    assert calls == [str(path)]